@@ -0,0 +1,154 @@
+import re
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Set, Tuple
+
+
+# Course codes like COL100, COL 100 or COL-100; the lookbehind and lookahead
+# keep "in 2023" or "ELL1010" from being read as codes. Candidates are matched
+# in any case and kept if their prefix is uppercase or a known department, so
+# "col106" counts but "top 100 courses" and "study for 100 marks" don't
+COURSE_CODE = r'(?<![A-Za-z])[A-Za-z]{2,3}[\s-]?\d{3}(?!\d)'
+COURSE_PREFIX = re.compile(r'[A-Za-z]+')
+
+# Keywords per collection, matched as whole words. Inflections are listed
+# explicitly so "bt" doesn't match inside "doubt" nor "intern" inside "international"
+COLLECTION_KEYWORDS = {
+    'courses': [
+        'course', 'courses', 'prereq', 'prereqs', 'prerequisite', 'prerequisites', 'credit', 'credits',
+        'professor', 'professors', 'prof', 'profs', 'class', 'classes', 'sem', 'semester', 'semesters',
+        'slot', 'slots', 'timing', 'timings', 'study', 'material', 'materials', 'book', 'books',
+    ],
+    'interviews': [
+        'interview', 'interviews', 'intern', 'interns', 'internship', 'internships', 'placement', 'placements',
+        'resume', 'resumes', 'company', 'companies', 'job', 'jobs', 'preparation', 'study',
+    ],
+    'inception': [
+        'hostel', 'hostels', 'mess', 'canteen', 'canteens', 'lhs', 'sac', 'oat', 'iitd',
+        'dassi', 'satti', 'fakka', 'bt',
+    ],
+    'united': [
+        'relationship', 'relationships', 'dating', 'crush', 'crushes', 'love', 'randi', 'rizz',
+        'breakup', 'breakups', 'gossip',
+    ],
+}
+
+CLUBS = {
+    "QC": "Quizzing Club: Participate in quizzes and improve your general knowledge.",
+    "DevClub": "Developer Student Club: Join to work on software development projects and learn new technologies.",
+    "DebSoc": "Debating Society: Engage in debates and improve your public speaking skills.",
+    "PFC": "Photography and Film Club: Learn photography and filmmaking skills, participate in photo walks and film screenings.",
+    "Dance Club": "Dance Club: From classical to contemporary, join to learn and perform various dance forms.",
+    "Vdefyn": "Vdefyn: A club related to dance activities and performances.",
+    "Music Club": "Music Club: Join to explore various genres, participate in concerts, and learn instruments.",
+    "FACC": "Fine Arts and Crafts Club: Engage in arts and crafts activities, participate in exhibitions.",
+    "Lit Club": "Literary Society: Engage in debates, writing competitions, and literary discussions.",
+    "EDC": "Entrepreneurship Development Cell: Join to learn about entrepreneurship, participate in startup events.",
+    "Drama Club": "Drama Club: For all the theatre enthusiasts, participate in plays, skits, and more.",
+    "Hindi Samiti and Spic Macay": "Hindi Samiti and Spic Macay: The maestros of ghazal, participate in cultural events.",
+    "Aries": "AI/ML Club: Explore artificial intelligence and machine learning, work on projects.",
+    "Axl8r": "Formula 1 Club: Join to learn about and participate in Formula 1 related activities.",
+    "Hyperloop": "Hyperloop: Work on building hyperloop technology.",
+    "Robotics Club": "Robotics Club: For tech enthusiasts, work on projects, participate in competitions.",
+    "ANCC": "Coding Club: Improve your competitive programming skills, participate in hackathons and coding competitions.",
+    "PAC": "Physics Astronomy Club: Explore the universe, participate in stargazing events and discussions."
+}
+
+# Other names students use for the clubs; a generic mention of clubs brings in all of them
+CLUB_ALIASES = {
+    "DevClub": ['dev club'],
+    "DebSoc": ['debating society'],
+    "Lit Club": ['litclub', 'literary society'],
+    "Hindi Samiti and Spic Macay": ['hindi samiti', 'spic macay'],
+}
+ALL_CLUBS = ['club', 'clubs', 'society', 'societies']
+
+
+def _build_terms() -> Dict[str, Tuple[Set[str], Set[str]]]:
+    """Every keyword, lowercased, with the collections and clubs it points to."""
+    terms: Dict[str, Tuple[Set[str], Set[str]]] = {}
+    def add(term: str, collection: str = None, club: str = None):
+        collections, clubs = terms.setdefault(term.lower(), (set(), set()))
+        if collection:
+            collections.add(collection)
+        if club:
+            clubs.add(club)
+
+    for collection, keywords in COLLECTION_KEYWORDS.items():
+        for keyword in keywords:
+            add(keyword, collection=collection)
+    for club in CLUBS:
+        for name in [club] + CLUB_ALIASES.get(club, []):
+            add(name, club=club)
+    for term in ALL_CLUBS:
+        for club in CLUBS:
+            add(term, club=club)
+    return terms
+
+def _trie_pattern(words: List[str]) -> str:
+    """Regex matching any of the words, nested by shared prefix so the engine never backtracks across keywords.
+
+    Longer words are tried before their prefixes ("dance club" before "dance").
+    Spaces in multi-word names match any whitespace.
+    """
+    trie: Dict = {}
+    for word in words:
+        node = trie
+        for char in word:
+            node = node.setdefault(char, {})
+        node[''] = {}
+
+    def pattern(node: Dict) -> str:
+        branches = [
+            (r'\s+' if char == ' ' else re.escape(char)) + pattern(child)
+            for char, child in sorted(node.items()) if char
+        ]
+        if not branches:
+            return ''
+        optional = '' in node
+        if len(branches) == 1 and not optional:
+            return branches[0]
+        return '(?:' + '|'.join(branches) + ')' + ('?' if optional else '')
+
+    return pattern(trie)
+
+TERMS = _build_terms()
+
+# One pattern for everything: course codes first, then every keyword as whole words
+QUERY_PATTERN = re.compile(rf'(?P<code>{COURSE_CODE})|\b(?P<term>{_trie_pattern(list(TERMS))})\b', re.IGNORECASE)
+
+
+@dataclass
+class QueryAnalysis:
+    """Course codes, collection keyword hits and clubs found in a query."""
+    course_codes: List[str] = field(default_factory=list)
+    collections: Set[str] = field(default_factory=set)
+    clubs: List[str] = field(default_factory=list)
+
+
+def analyze_query(query: str, departments: Optional[Set[str]] = None) -> QueryAnalysis:
+    """Scan the query once for course codes, collection keywords and club mentions.
+
+    departments are the known course code prefixes; without them only
+    uppercase codes are recognised.
+    """
+    analysis = QueryAnalysis()
+    clubs = set()
+    for match in QUERY_PATTERN.finditer(query):
+        code = match.group('code')
+        if code:
+            prefix = COURSE_PREFIX.match(code).group(0)
+            if prefix.isupper() or (departments is not None and prefix.upper() in departments):
+                analysis.course_codes.append(re.sub(r'[\s-]', '', code.upper()))
+            continue
+        collections, term_clubs = TERMS[" ".join(match.group('term').lower().split())]
+        analysis.collections |= collections
+        clubs |= term_clubs
+    # Clubs keep their CLUBS order
+    analysis.clubs = [club for club in CLUBS if club in clubs]
+    return analysis
+
+def club_context(clubs: List[str]) -> str:
+    """Descriptions of the clubs a query mentions."""
+    if clubs:
+        return "\n".join(CLUBS[club] for club in clubs)
+    return "No specific club information found in the query."
@@ -0,0 +1,142 @@
+import time
+import threading
+from collections import OrderedDict
+from typing import Any, Hashable, Optional
+
+import numpy as np
+
+
+# Returned by TTLCache.get for absent keys, so None can be cached as a value
+MISSING = object()
+
+
+class TTLCache:
+    """Thread-safe LRU cache whose entries also expire after a time-to-live.
+
+    Shared across Streamlit sessions through st.cache_resource, so every access
+    goes through a lock. Hit and miss counters are kept for tuning.
+    """
+
+    def __init__(self, max_size: int = 1024, ttl: float = 3600.0):
+        self.max_size = max_size
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: Hashable, default: Any = MISSING) -> Any:
+        """Return the cached value, or default if absent or expired."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                expires_at, value = entry
+                if expires_at > time.monotonic():
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return value
+                del self._entries[key]
+            self.misses += 1
+            return default
+
+    def set(self, key: Hashable, value: Any, ttl: Optional[float] = None) -> None:
+        """Store a value, evicting the least recently used entry when full."""
+        with self._lock:
+            expires_at = time.monotonic() + (self.ttl if ttl is None else ttl)
+            self._entries[key] = (expires_at, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def delete(self, key: Hashable) -> None:
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    @property
+    def hit_rate(self) -> float:
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+
+class SemanticCache:
+    """Thread-safe LRU cache keyed on embedding similarity.
+
+    A lookup hits when a stored vector lies within max_distance (cosine
+    distance) of the query vector and was stored with an equal tag. Entries
+    expire after a time-to-live.
+    """
+
+    def __init__(self, max_size: int = 1024, ttl: float = 86400.0, max_distance: float = 0.05):
+        self.max_size = max_size
+        self.ttl = ttl
+        self.max_distance = max_distance
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._next_key = 0
+        self._keys = []
+        self._matrix = None
+        self._lock = threading.Lock()
+
+    def get(self, vector, tag: Hashable = None) -> Any:
+        """Return the value stored for the closest matching vector, or None."""
+        query = _normalize(vector)
+        with self._lock:
+            if self._entries:
+                if self._matrix is None:
+                    self._keys = list(self._entries.keys())
+                    self._matrix = np.stack([self._entries[key][1] for key in self._keys])
+                similarities = self._matrix @ query
+                now = time.monotonic()
+                for index in np.argsort(-similarities):
+                    if 1.0 - similarities[index] > self.max_distance:
+                        break
+                    key = self._keys[index]
+                    entry = self._entries.get(key)
+                    if entry is None:
+                        continue
+                    expires_at, _, entry_tag, value = entry
+                    if expires_at <= now:
+                        del self._entries[key]
+                        self._matrix = None
+                        continue
+                    if entry_tag == tag:
+                        self._entries.move_to_end(key)
+                        self.hits += 1
+                        return value
+            self.misses += 1
+            return None
+
+    def set(self, vector, value: Any, tag: Hashable = None) -> None:
+        """Store a value under a vector, evicting the least recently used entry when full."""
+        with self._lock:
+            self._entries[self._next_key] = (time.monotonic() + self.ttl, _normalize(vector), tag, value)
+            self._next_key += 1
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+            self._matrix = None
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._matrix = None
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    @property
+    def hit_rate(self) -> float:
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+
+def _normalize(vector) -> np.ndarray:
+    vector = np.asarray(vector, dtype=np.float32)
+    return vector / (np.linalg.norm(vector) or 1.0)
@@ -0,0 +1,150 @@
+import json
+import re
+import hashlib
+from typing import Dict, Iterable, List, Optional, Tuple
+
+
+def generate_course_id(course_code: str) -> str:
+    """Point ID of a course in Qdrant: MD5 of the code after normalizing its format.
+
+    Shared by the app and the ingestion scripts so both address the same points.
+    """
+    normalized = re.sub(r'[\s-]', '', course_code.upper())
+    return hashlib.md5(normalized.encode()).hexdigest()
+
+def edit_distance(a: str, b: str) -> int:
+    """Optimal string alignment distance: Levenshtein plus adjacent transpositions.
+
+    Transpositions count as one edit so COL016 is a single typo away from COL106.
+    """
+    previous_previous = None
+    previous = list(range(len(b) + 1))
+    for i in range(1, len(a) + 1):
+        current = [i] + [0] * len(b)
+        for j in range(1, len(b) + 1):
+            cost = 0 if a[i - 1] == b[j - 1] else 1
+            current[j] = min(
+                previous[j] + 1,
+                current[j - 1] + 1,
+                previous[j - 1] + cost
+            )
+            if i > 1 and j > 1 and a[i - 1] == b[j - 2] and a[i - 2] == b[j - 1]:
+                current[j] = min(current[j], previous_previous[j - 2] + 1)
+        previous_previous, previous = previous, current
+    return previous[len(b)]
+
+
+class BKTree:
+    """Burkhard-Keller tree for edit-distance lookups over a fixed vocabulary."""
+
+    def __init__(self, words: Iterable[str] = ()):
+        self.root = None
+        for word in words:
+            self.add(word)
+
+    def add(self, word: str) -> None:
+        if self.root is None:
+            self.root = (word, {})
+            return
+        node = self.root
+        while True:
+            node_word, children = node
+            distance = edit_distance(word, node_word)
+            if distance == 0:
+                return
+            if distance not in children:
+                children[distance] = (word, {})
+                return
+            node = children[distance]
+
+    def search(self, word: str, max_distance: int) -> List[Tuple[int, str]]:
+        """All (distance, word) pairs within max_distance, closest first."""
+        results = []
+        stack = [self.root] if self.root else []
+        while stack:
+            node_word, children = stack.pop()
+            distance = edit_distance(word, node_word)
+            if distance <= max_distance:
+                results.append((distance, node_word))
+            for child_distance, child in children.items():
+                if distance - max_distance <= child_distance <= distance + max_distance:
+                    stack.append(child)
+        return sorted(results)
+
+
+class CourseCatalog:
+    """Compact in-memory index of known course codes and names.
+
+    Validates codes without a network call and suggests close matches for typos.
+    """
+
+    def __init__(self, courses: Dict[str, str]):
+        self.names = {normalize_code(code): name for code, name in courses.items()}
+        self.departments = {department_of(code) for code in self.names}
+        self.tree = BKTree(self.names)
+
+    @classmethod
+    def from_json(cls, path: str) -> "CourseCatalog":
+        """Load from a course JSON keyed by code, e.g. final_courses.json."""
+        with open(path, 'r', encoding='utf-8') as file:
+            courses = json.load(file)
+        return cls({code: data.get('course_name', '') for code, data in courses.items()})
+
+    @classmethod
+    def from_qdrant(cls, client, collection_name: str = 'courses') -> "CourseCatalog":
+        """Scroll the course codes and names out of the courses collection."""
+        courses = {}
+        offset = None
+        while True:
+            points, offset = client.scroll(
+                collection_name=collection_name,
+                limit=1000,
+                offset=offset,
+                with_payload=['course_code', 'course_name'],
+                with_vectors=False
+            )
+            for point in points:
+                if point.payload and point.payload.get('course_code'):
+                    courses[point.payload['course_code']] = point.payload.get('course_name', '')
+            if offset is None:
+                return cls(courses)
+
+    def __contains__(self, code: str) -> bool:
+        return normalize_code(code) in self.names
+
+    def __len__(self) -> int:
+        return len(self.names)
+
+    def suggest(self, code: str, max_distance: int = 1, limit: int = 3) -> List[str]:
+        """Known codes at the smallest edit distance from code, if any are close enough."""
+        matches = self.tree.search(normalize_code(code), max_distance)
+        if not matches:
+            return []
+        closest = matches[0][0]
+        return [word for distance, word in matches if distance == closest][:limit]
+
+    def resolve(self, codes: List[str]) -> Tuple[List[str], List[str], Dict[str, List[str]]]:
+        """Split extracted codes into known codes, invalid codes and typo suggestions.
+
+        Matches that are neither known nor close to a known code and don't use a
+        known department prefix (e.g. "is 2024") are dropped as not being codes.
+        """
+        known, invalid, suggestions = [], [], {}
+        for code in dict.fromkeys(normalize_code(code) for code in codes):
+            if code in self.names:
+                known.append(code)
+                continue
+            close = self.suggest(code)
+            if close:
+                suggestions[code] = close
+            if close or department_of(code) in self.departments:
+                invalid.append(code)
+        return known, invalid, suggestions
+
+
+def normalize_code(code: str) -> str:
+    return re.sub(r'[\s-]', '', code.upper())
+
+def department_of(code: str) -> Optional[str]:
+    match = re.match(r'[A-Z]+', code)
+    return match.group(0) if match else None
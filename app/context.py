@@ -0,0 +1,111 @@
+from typing import List, Dict, Tuple
+
+
+# Rough characters-per-token ratio for English text on Llama/Mixtral tokenizers
+CHARS_PER_TOKEN = 4
+
+# No single hit may take more than this many tokens of the budget
+MAX_ITEM_TOKENS = 300
+
+# Cap for a hit merged from consecutive chunks (see diversity.merge_adjacent)
+MAX_SPAN_TOKENS = 500
+
+# Course fields worth showing the LLM, in display order, with their labels
+COURSE_FIELDS = [
+    ('name', 'Name'),
+    ('credits', 'Credits'),
+    ('structure', 'L-T-P'),
+    ('prof', 'Instructor'),
+    ('slot', 'Slot'),
+    ('schedule', 'Lectures'),
+    ('prereqs', 'Prerequisites'),
+    ('overlaps', 'Overlaps'),
+    ('description', 'About'),
+]
+
+
+def estimate_tokens(text: str) -> int:
+    """Cheap token estimate, close enough to budget prompts without a tokenizer."""
+    return (len(text) + CHARS_PER_TOKEN - 1) // CHARS_PER_TOKEN
+
+def truncate_to_tokens(text: str, max_tokens: int) -> str:
+    max_chars = max_tokens * CHARS_PER_TOKEN
+    if len(text) <= max_chars:
+        return text
+    return text[:max_chars].rsplit(' ', 1)[0] + " ..."
+
+def format_value(value) -> str:
+    if isinstance(value, (list, tuple)):
+        return ", ".join(str(item) for item in value if item)
+    return " ".join(str(value).split())
+
+def format_course(code: str, info: Dict) -> str:
+    """One compact line per course, leaving out empty and bookkeeping fields."""
+    parts = [f"[course {code}]"]
+    for field, label in COURSE_FIELDS:
+        value = info.get(field)
+        if value:
+            parts.append(f"{label}: {format_value(value)}")
+    level = info.get('level_info')
+    if level:
+        parts.append(f"Level: {level.get('level')}, {level.get('difficulty')}")
+    return " | ".join(parts)
+
+def format_hit(collection: str, payload: Dict) -> str:
+    """Render a search hit as a short tagged passage."""
+    if collection == 'courses':
+        info = {
+            'name': payload.get('course_name'),
+            'credits': payload.get('credits'),
+            'prof': payload.get('instructor'),
+            'slot': payload.get('slot'),
+            'prereqs': payload.get('prerequisites'),
+            'description': payload.get('data'),
+        }
+        return format_course(str(payload.get('course_code', '')).upper(), info)
+    if collection == 'interviews':
+        return f"[interview with {payload.get('interviewee', 'a senior')}] {format_value(payload.get('data', ''))}"
+    return f"[{collection}] {format_value(payload.get('text') or payload.get('data', ''))}"
+
+def build_context(course_info: Dict[str, Dict], collection_results: Dict[str, List[Dict]],
+                  token_budget: int) -> Tuple[str, int]:
+    """Assemble the prompt context within a token budget.
+
+    Exact course lookups come first, then search hits from every collection in
+    order of score. Hit scores are reciprocal rank fusion scores from
+    Navigator.search_collection, normalized per collection to at most 1.0 and
+    not cosine similarities; filtered course listings score 2.0 so they come first. Duplicate passages
+    are dropped and each item is capped at MAX_ITEM_TOKENS, or MAX_SPAN_TOKENS
+    for merged chunks. Returns the context text and its estimated token count.
+    """
+    candidates = [(format_course(code, info), MAX_ITEM_TOKENS) for code, info in course_info.items()]
+    hits = sorted(
+        (
+            (hit['score'], collection, hit['payload'])
+            for collection, collection_hits in collection_results.items()
+            for hit in collection_hits
+            if hit.get('payload')
+        ),
+        key=lambda hit: hit[0],
+        reverse=True
+    )
+    candidates.extend(
+        (format_hit(collection, payload), MAX_SPAN_TOKENS if payload.get('merged_ids') else MAX_ITEM_TOKENS)
+        for _, collection, payload in hits
+    )
+
+    lines = []
+    seen = set()
+    tokens_used = 0
+    for text, max_tokens in candidates:
+        text = truncate_to_tokens(text, max_tokens)
+        if text in seen:
+            continue
+        tokens = estimate_tokens(text) + 1
+        if tokens_used + tokens > token_budget:
+            continue
+        seen.add(text)
+        lines.append(text)
+        tokens_used += tokens
+
+    return "\n".join(lines), tokens_used
@@ -0,0 +1,790 @@
+import os
+import re
+import time
+import uuid
+import queue
+import asyncio
+import contextvars
+import threading
+from contextlib import aclosing
+from typing import List, Dict, Any, Optional, Set, AsyncIterator, Iterator, Tuple, Callable
+import numpy as np
+from groq import AsyncGroq
+from qdrant_client import AsyncQdrantClient, QdrantClient, models
+from qdrant_client.http.exceptions import UnexpectedResponse
+from analyzer import QueryAnalysis, analyze_query, club_context
+from intent import COLLECTIONS, IntentRouter, llm_intent_scores_async
+from caching import MISSING, SemanticCache, TTLCache
+from catalog import CourseCatalog, generate_course_id
+from encoders import load_encoder
+from context import build_context, estimate_tokens
+from lexical import SPARSE_VECTOR_NAME, reciprocal_rank_fusion, sparse_vector
+from planner import CourseQueryPlan, plan_course_query
+from diversity import merge_adjacent, mmr
+from quantization import QUANTIZATION_MODES, search_params
+from gateway import LLMGateway
+from memory import SUMMARY_MAX_TOKENS, Conversation, summary_prompt
+import telemetry
+
+
+model = "mixtral-8x7b-32768"
+# Smaller model answers when the primary one is out of budget or keeps being throttled
+FALLBACK_MODEL = "llama-3.1-8b-instant"
+# Client-side budgets (requests, tokens per minute), kept just under Groq's limits
+# so requests queue here instead of collecting 429s
+LLM_LIMITS = [
+    (model, 30, 5000),
+    (FALLBACK_MODEL, 30, 20000),
+]
+# Retries per model on 429s and transient errors, and how long a request may
+# queue for the primary's budget before falling back
+LLM_MAX_RETRIES = 3
+LLM_MAX_QUEUE_WAIT = 2.0
+# Background calls (conversation summaries) share the fallback model's budget
+# with answers, so they only run while this fraction of it would stay free
+LLM_BACKGROUND_HEADROOM = 0.5
+
+# Query encoder backend: "torch" runs the fp32 sentence-transformers model,
+# "onnx" runs the int8-quantized ONNX export on onnxruntime without torch
+ENCODER_BACKEND = os.environ.get("ENCODER_BACKEND", "torch")
+EMBEDDING_CACHE_SIZE = 4096
+
+# Score collections with the local embedding router and only fall back to the
+# LLM intent call when the router's top probability is below the threshold
+USE_LOCAL_ROUTER = True
+ROUTER_MIN_CONFIDENCE = 0.45
+
+# Start retrieval for every collection while the intent call is in flight, then
+# keep only the collections the intent analysis selects
+SPECULATIVE_RETRIEVAL = True
+
+# Shared course cache: processed course info per normalized code, with invalid
+# codes cached as None for a shorter time
+COURSE_CACHE_SIZE = 2048
+COURSE_CACHE_TTL = 6 * 60 * 60
+COURSE_NEGATIVE_TTL = 60 * 60
+
+# Semantic response cache: a query reuses a cached answer when its embedding is
+# within RESPONSE_CACHE_MAX_DISTANCE (cosine distance) of a cached query that
+# mentioned the same course codes
+RESPONSE_CACHE_SIZE = 1024
+RESPONSE_CACHE_TTL = 24 * 60 * 60
+RESPONSE_CACHE_MAX_DISTANCE = 0.05
+
+# Course catalog used to validate codes in memory, loaded from the JSON when
+# present and otherwise scrolled from the courses collection at startup
+COURSE_CATALOG_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'final_courses.json')
+
+# Estimated tokens of retrieved context allowed into the final prompt
+CONTEXT_TOKEN_BUDGET = 1500
+
+# Estimated tokens of conversation (rolling summary plus latest exchange)
+# allowed into the final prompt
+HISTORY_TOKEN_BUDGET = 700
+
+# Minimum cosine similarity for a search hit to be used as context
+SCORE_THRESHOLD = 0.3
+
+# Score of filtered course listings; search hits score at most 1.0, so exact
+# matches outrank all of them in the context
+LISTING_SCORE = 2.0
+
+# Collections indexed with BM25 sparse vectors next to the dense ones; these are
+# searched with both and the rankings fused, which needs fewer hits per collection
+HYBRID_COLLECTIONS = {'courses', 'inception', 'united'}
+RETRIEVAL_LIMIT = 3
+
+# Candidates fetched per hit kept; neighbouring chunks among them are merged and
+# a diverse top RETRIEVAL_LIMIT is picked with MMR over their dense vectors
+CANDIDATE_MULTIPLIER = 4
+
+# Dense vector quantization the collections were indexed with ("none", "int8"
+# or "binary", see --quantization in the ingestion scripts). Quantized
+# searches oversample candidates and rescore them with the fp32 originals
+QUANTIZATION = os.environ.get("QUANTIZATION", "none")
+if QUANTIZATION not in QUANTIZATION_MODES:
+    raise ValueError(f"QUANTIZATION is {QUANTIZATION!r}, expected one of {', '.join(QUANTIZATION_MODES)}")
+SEARCH_PARAMS = search_params(QUANTIZATION)
+
+# Listing questions that only filter courses ("which 3-credit COL courses are in
+# slot A") are answered by a filtered scroll returning at most this many courses,
+# with only the fields needed to list them
+FILTERED_COURSE_LIMIT = 25
+FILTERED_COURSE_FIELDS = ['course_code', 'course_name', 'credits', 'slot', 'instructor']
+
+# Per-request traces are appended to TRACE_LOG_PATH as JSON lines and the
+# process-wide metrics are rewritten to METRICS_PATH in Prometheus text format
+# (for node_exporter's textfile collector) after every message; unset disables
+TRACE_LOG_PATH = os.environ.get("TRACE_LOG_PATH")
+METRICS_PATH = os.environ.get("METRICS_PATH")
+
+def get_course_level_info(course_code: str) -> Optional[Dict[str, str]]:
+    """Get course level information with IIT-D specific context."""
+    if not course_code:
+        return None
+
+    match = re.search(r'[A-Z]{2,3}\d{3}', course_code)
+    if not match:
+        return None
+
+    level_num = int(course_code[-3])
+    
+    levels = {
+        1: {
+            "level": "100-level",
+            "description": "First year courses, mostly fundae",
+            "difficulty": "Chill scene for most part",
+            "advice": "Good for freshies, basic concepts"
+        },
+        2: {
+            "level": "200-level",
+            "description": "Second year core stuff",
+            "difficulty": "Moderate BT",
+            "advice": "Start building your fundae"
+        },
+        3: {
+            "level": "300-level",
+            "description": "Third year depth courses",
+            "difficulty": "Decent BT level",
+            "advice": "Major concepts, stay on your toes"
+        },
+        4: {
+            "level": "400-level",
+            "description": "Final year specialized courses",
+            "difficulty": "Solid BT potential",
+            "advice": "Advanced stuff, needs dedication"
+        },
+        5: {
+            "level": "500-level",
+            "description": "Dual/Masters level",
+            "difficulty": "Heavy scene",
+            "advice": "Research oriented, proper grind required"
+        },
+        6: {
+            "level": "600-level",
+            "description": "Masters specialized",
+            "difficulty": "Peak BT hours",
+            "advice": "Research focus, publication worthy"
+        },
+        7: {
+            "level": "700-level",
+            "description": "Advanced graduate",
+            "difficulty": "Maximum BT",
+            "advice": "Deep research and innovation"
+        },
+        8: {
+            "level": "800-level",
+            "description": "Doctoral specialized",
+            "difficulty": "Beyond BT",
+            "advice": "Novel research contributions"
+        }
+    }
+    
+    return levels.get(level_num, {
+        "level": "unknown",
+        "description": "Specialized course",
+        "difficulty": "Depends on prof",
+        "advice": "Check with seniors"
+    })
+
+def select_collections(pattern_matches: Set[str], intent_scores: Dict[str, float]) -> Set[str]:
+    """Combine pattern matches and AI intent scores into the collections to use."""
+    AI_SCORE_THRESHOLD = 0.3
+    
+    collections = set(pattern_matches)
+    
+    for collection, score in intent_scores.items():
+        if score > AI_SCORE_THRESHOLD or collection in pattern_matches:
+            collections.add(collection)
+    
+    if not collections:
+        collections = set(COLLECTIONS)
+    
+    return collections
+
+def process_course_info(course_data: Dict) -> Dict:
+    """Process course information treating all fields as optional."""
+    if not course_data:
+        return {
+            "error": "Course information not available",
+            "message": "Please verify the course code or check the department website"
+        }
+
+    processed_info = {}
+    
+    # Define all possible fields
+    fields_mapping = {
+        "course_code": "code",
+        "course_name": "name",
+        "instructor": "prof",
+        "instructor_mail": "email",
+        "credits": "credits",
+        "credit_structure": "structure",
+        "prerequisites": "prereqs",
+        "slot": "slot",
+        "lec_time": "schedule",
+        "data": "description",
+        "overlaps": "overlaps",
+        "study_materials": "study_materials"
+    }
+    
+    # Process schedule if it exists
+    if 'lec_time' in course_data and course_data['lec_time']:
+        schedule = course_data['lec_time']
+        days_map = {
+            'M': 'Monday', 'T': 'Tuesday', 'W': 'Wednesday',
+            'Th': 'Thursday', 'F': 'Friday'
+        }
+        for abbr, full in days_map.items():
+            schedule = schedule.replace(abbr, full)
+        course_data['lec_time'] = schedule
+
+    # Only include fields that exist and have values
+    for db_field, output_field in fields_mapping.items():
+        if db_field in course_data and course_data[db_field]:
+            processed_info[output_field] = course_data[db_field]
+
+    # Add level info only if course code exists
+    if 'code' in processed_info:
+        level_info = get_course_level_info(processed_info['code'])
+        if level_info:
+            processed_info['level_info'] = level_info
+
+    return processed_info
+
+def build_prompt(query: str, relevant_collections: Set[str], course_info: Dict[str, Dict],
+                 invalid_courses: List[str], course_suggestions: Dict[str, List[str]], course_filters: str,
+                 clubs_info: str, history_context: str, context: str) -> str:
+    """The final answer prompt."""
+    return f"""IITD Campus Navigator 🎓
+
+Query: {query}
+
+Intent Analysis:
+- Main focus areas detected across campus life
+- Relevant information from {', '.join(relevant_collections)}
+- Using only verified course information
+- 
+Guidelines:
+1. Only provide course details that are explicitly available in the data
+2. If a course field isn't available, don't mention it
+3. For invalid course codes, offer the "Did you mean" codes if any, otherwise suggest checking the department website
+4. Use IITD lingo naturally (bhai, atthi (8 cg), nahli (9 cg), devdass (broke up person), machao (a cracked dude who is so successful everyone's jealous), super senior (5th year senior), faccha/facchi (first year), rdv (rendevezous, cult fest of iitd), litwits (meme channel of iitd), dassi (10 cg), satti (7 cg), fakka (fail course), bt (bad time/bad trip))
+5. Keep responses factual and data-driven
+6. Consider conversation history for context
+7. You are not meant to use words like atthi nahli dassi as replacement for bhai
+8. Integrate Gen-Z Lingo
+9. Use swear words if the query contains so
+
+Courses found: {list(course_info.keys()) if course_info else "None"}
+Invalid courses: {invalid_courses if invalid_courses else "None"}
+Did you mean: {course_suggestions if course_suggestions else "None"}
+Course filters: {course_filters if course_filters else "None"} (courses in CONTEXT already match these)
+Clubs at IIT Delhi: {clubs_info}
+
+{history_context}
+
+CONTEXT:
+{context}"""
+
+def load_course_catalog(make_client: Callable[[], QdrantClient]) -> Optional[CourseCatalog]:
+    """Known course codes, from the JSON when present and otherwise from Qdrant, or None if unavailable."""
+    try:
+        if os.path.exists(COURSE_CATALOG_PATH):
+            return CourseCatalog.from_json(COURSE_CATALOG_PATH)
+        return CourseCatalog.from_qdrant(make_client())
+    except Exception as e:
+        print(f"Error loading course catalog: {e}")
+        return None
+
+
+def dense_vector(point) -> Optional[List[float]]:
+    """A search hit's dense vector; collections with a sparse vector return named vectors, the dense one unnamed."""
+    return point.vector.get("") if isinstance(point.vector, dict) else point.vector
+
+def cosine_similarity(query_vector: List[float], query_norm: float, vector: Optional[List[float]]) -> float:
+    """Cosine similarity of a stored vector to the query, or 0.0 without one."""
+    if not vector:
+        return 0.0
+    vector = np.asarray(vector, dtype=np.float32)
+    return float(np.dot(query_vector, vector) / (query_norm * (np.linalg.norm(vector) or 1.0)))
+
+def missing_sparse_vector(error: UnexpectedResponse) -> bool:
+    """Whether Qdrant rejected a search because the collection has no sparse vector to query."""
+    return error.status_code == 400 and SPARSE_VECTOR_NAME.encode() in (error.content or b"")
+
+
+class Navigator:
+    """Async chat pipeline shared by the Streamlit app and the HTTP API.
+
+    One instance serves every conversation in a process. Network calls go
+    through the async Qdrant and Groq clients, so concurrent messages wait on
+    I/O without holding a thread each; only query encoding runs in a worker
+    thread. Callers hold a Conversation per session; the navigator records
+    each exchange in it and keeps its summary up to date.
+    """
+
+    def __init__(self, groq: AsyncGroq, client: AsyncQdrantClient, encoder,
+                 intent_router: Optional[IntentRouter] = None, course_catalog: Optional[CourseCatalog] = None,
+                 course_cache: Optional[TTLCache] = None, response_cache: Optional[SemanticCache] = None):
+        self.llm = LLMGateway(groq, LLM_LIMITS, max_retries=LLM_MAX_RETRIES, max_queue_wait=LLM_MAX_QUEUE_WAIT,
+                              background_headroom=LLM_BACKGROUND_HEADROOM)
+        self.client = client
+        # Hybrid collections not yet rebuilt with the sparse vector
+        self.dense_only_collections: Set[str] = set()
+        self.encoder = encoder
+        self.intent_router = intent_router or IntentRouter(encoder)
+        self.course_catalog = course_catalog
+        self.course_cache = course_cache or TTLCache(max_size=COURSE_CACHE_SIZE, ttl=COURSE_CACHE_TTL)
+        self.response_cache = response_cache or SemanticCache(
+            max_size=RESPONSE_CACHE_SIZE,
+            ttl=RESPONSE_CACHE_TTL,
+            max_distance=RESPONSE_CACHE_MAX_DISTANCE
+        )
+
+        telemetry.metrics.gauge('response_cache_hits', lambda: self.response_cache.hits)
+        telemetry.metrics.gauge('response_cache_misses', lambda: self.response_cache.misses)
+        telemetry.metrics.gauge('course_cache_hits', lambda: self.course_cache.hits)
+        telemetry.metrics.gauge('course_cache_misses', lambda: self.course_cache.misses)
+        telemetry.metrics.gauge('embedding_cache_size', lambda: len(getattr(self.encoder, 'cache', ())))
+
+    @classmethod
+    def from_settings(cls, groq_api_key: str, qdrant_url: str, qdrant_api_key: str) -> "Navigator":
+        """Build the clients, encoder, router and course catalog."""
+        encoder = load_encoder(ENCODER_BACKEND, cache_size=EMBEDDING_CACHE_SIZE)
+        return cls(
+            # Retries are left to the gateway, which also knows when to fall back
+            groq=AsyncGroq(api_key=groq_api_key, max_retries=0),
+            client=AsyncQdrantClient(url=qdrant_url, api_key=qdrant_api_key),
+            encoder=encoder,
+            course_catalog=load_course_catalog(lambda: QdrantClient(url=qdrant_url, api_key=qdrant_api_key)),
+        )
+
+    async def encode(self, text: str) -> List[float]:
+        """Embed a query off the event loop."""
+        with telemetry.span('encode'):
+            vector = await asyncio.to_thread(self.encoder.encode, text)
+        return vector.tolist()
+
+    async def analyze_query_intent(self, query: str) -> Dict[str, float]:
+        """Analyze query intent and assign collection relevance scores."""
+        return await llm_intent_scores_async(self.llm, query)
+
+    async def route_query_intent(self, query: str, query_vector: List[float]) -> Dict[str, float]:
+        """Score collection relevance locally, asking the LLM only when the router is unsure."""
+        if USE_LOCAL_ROUTER:
+            with telemetry.span('route'):
+                scores, confidence = self.intent_router.score(query_vector)
+            if confidence >= ROUTER_MIN_CONFIDENCE:
+                return scores
+        with telemetry.span('intent_llm'):
+            return await self.analyze_query_intent(query)
+
+    async def determine_query_type(self, query: str, query_vector: Optional[List[float]] = None,
+                                   analysis: Optional[QueryAnalysis] = None) -> Set[str]:
+        """Determine which collections to search using pattern matching and AI intent."""
+        if query_vector is None:
+            query_vector = await self.encode(query)
+        analysis = analysis or analyze_query(query, self.departments())
+        return select_collections(analysis.collections, await self.route_query_intent(query, query_vector))
+
+    async def search_collection(self, collection: str, query_vector: List[float], limit: int,
+                                query_sparse: Optional[models.SparseVector] = None,
+                                query_filter: Optional[models.Filter] = None) -> List[Dict]:
+        """Search a single collection and keep hits above the score cutoff.
+
+        With a sparse query vector, the dense and lexical searches go out in one
+        batch request. Every hit has to clear the cosine score cutoff, lexical
+        hits by their stored dense vector. Rankings are merged with reciprocal
+        rank fusion and hits are scored by it rather than by cosine similarity,
+        normalized by the number of lists fused so the top hit of any collection
+        scores 1.0 whether or not it has a lexical index. A payload filter applies to both. Both searches over-fetch
+        with vectors so overlapping chunks can be merged and near-duplicates
+        skipped before the top hits are taken.
+
+        Collections indexed before the sparse vector was added reject the lexical
+        request; they are searched dense-only from then on. Any other error is
+        raised, so a passing outage doesn't turn lexical search off for good.
+        """
+        candidates = limit * CANDIDATE_MULTIPLIER
+        requests = [
+            models.QueryRequest(query=query_vector, filter=query_filter, params=SEARCH_PARAMS, limit=candidates,
+                                with_payload=True, with_vector=True)
+        ]
+        if query_sparse is not None and collection not in self.dense_only_collections:
+            requests.append(
+                models.QueryRequest(query=query_sparse, using=SPARSE_VECTOR_NAME, filter=query_filter,
+                                    limit=candidates, with_payload=True, with_vector=True)
+            )
+        with telemetry.span('search', collection=collection):
+            try:
+                responses = await self.client.query_batch_points(collection_name=collection, requests=requests)
+            except UnexpectedResponse as e:
+                if len(requests) == 1 or not missing_sparse_vector(e):
+                    raise
+                print(f"Error in lexical search of {collection}, searching dense-only: {e}")
+                telemetry.record_error('lexical_search', e, collection=collection)
+                self.dense_only_collections.add(collection)
+                responses = await self.client.query_batch_points(collection_name=collection, requests=requests[:1])
+
+        dense_hits = [point for point in responses[0].points if point.score > SCORE_THRESHOLD]
+        query_norm = np.linalg.norm(query_vector) or 1.0
+        lexical_hits = [
+            [point for point in response.points
+             if cosine_similarity(query_vector, query_norm, dense_vector(point)) > SCORE_THRESHOLD]
+            for response in responses[1:]
+        ]
+        fused = reciprocal_rank_fusion([dense_hits] + lexical_hits, normalize=True)
+        hits = [
+            {'id': point.id, 'score': score, 'payload': point.payload, 'vector': dense_vector(point)}
+            for score, point in fused
+        ]
+        spans = merge_adjacent(collection, hits)
+        telemetry.count('chunks_merged', len(hits) - len(spans))
+        selected = mmr(spans, limit)
+        return [{'id': hit['id'], 'score': hit['score'], 'payload': hit['payload']} for hit in selected]
+
+    async def fetch_from_collections(self, query: str, collections: Set[str], limit: int = RETRIEVAL_LIMIT,
+                                     query_vector: Optional[List[float]] = None) -> Dict[str, List[Dict]]:
+        """Fetch relevant results from specified collections, searching them concurrently."""
+        if not collections:
+            return {}
+
+        try:
+            if query_vector is None:
+                query_vector = await self.encode(query)
+        except Exception as e:
+            print(f"Error in vector search: {e}")
+            return {collection: [] for collection in collections}
+
+        query_sparse = sparse_vector(query, query=True)
+
+        # One request per collection, all in flight at once, so latency tracks the
+        # slowest collection rather than the sum of them
+        collections = list(collections)
+        with telemetry.span('retrieve'):
+            responses = await asyncio.gather(*[
+                self.search_collection(
+                    collection, query_vector, limit,
+                    query_sparse if collection in HYBRID_COLLECTIONS else None
+                )
+                for collection in collections
+            ], return_exceptions=True)
+
+        results = {}
+        for collection, response in zip(collections, responses):
+            if isinstance(response, Exception):
+                print(f"Error searching collection {collection}: {response}")
+                telemetry.record_error('search', response, collection=collection)
+                response = []
+            results[collection] = response
+        return results
+
+    async def fetch_filtered_courses(self, query: str, plan: CourseQueryPlan,
+                                     query_vector: List[float]) -> Tuple[List[Dict], bool]:
+        """Answer a question's course constraints with one request against the payload indexes.
+
+        Listing questions scroll every matching course; other questions run the
+        usual hybrid search restricted to the matching courses. When nothing
+        matches, e.g. because the collection predates the derived payload
+        fields, the unfiltered search is used instead. Returns the hits and
+        whether they match the constraints.
+        """
+        query_sparse = sparse_vector(query, query=True)
+        try:
+            if plan.listing:
+                with telemetry.span('filtered_scroll', collection='courses'):
+                    points, _ = await self.client.scroll(
+                        collection_name='courses',
+                        scroll_filter=plan.to_filter(),
+                        limit=FILTERED_COURSE_LIMIT,
+                        with_payload=FILTERED_COURSE_FIELDS,
+                    )
+                hits = [{'id': point.id, 'score': LISTING_SCORE, 'payload': point.payload} for point in points]
+            else:
+                hits = await self.search_collection(
+                    'courses', query_vector, RETRIEVAL_LIMIT, query_sparse, plan.to_filter()
+                )
+            if hits:
+                return hits, True
+            telemetry.count('filtered_courses_empty')
+        except Exception as e:
+            print(f"Error in filtered course search: {e}")
+            telemetry.record_error('filtered_courses', e, collection='courses')
+
+        try:
+            return await self.search_collection('courses', query_vector, RETRIEVAL_LIMIT, query_sparse), False
+        except Exception as e:
+            print(f"Error searching collection courses: {e}")
+            telemetry.record_error('search', e, collection='courses')
+            return [], False
+
+    async def validate_and_get_courses(self, codes: List[str]) -> Dict[str, Dict[str, Any]]:
+        """Fetch several courses in one retrieve call, keyed by their normalized code."""
+        # Qdrant returns hex IDs in dashed UUID form, so compare them as UUIDs
+        id_to_code = {str(uuid.UUID(generate_course_id(code))): code for code in codes}
+        result = await self.client.retrieve(
+            collection_name='courses',
+            ids=list(id_to_code.keys())
+        )
+        return {
+            id_to_code[str(uuid.UUID(str(point.id)))]: point.payload
+            for point in result
+            if point.payload
+        }
+
+    def departments(self) -> Optional[Set[str]]:
+        """Known course code prefixes, or None without a catalog."""
+        return self.course_catalog.departments if self.course_catalog else None
+
+    def resolve_course_codes(self, codes: List[str]) -> Tuple[List[str], List[str], Dict[str, List[str]]]:
+        """Split codes into known codes, unknown codes and typo suggestions without a network call."""
+        if self.course_catalog is None:
+            return codes, [], {}
+        return self.course_catalog.resolve(codes)
+
+    async def lookup_courses(self, codes: List[str]) -> Tuple[Dict[str, Dict], List[str]]:
+        """Resolve course codes to processed info and invalid codes via the shared cache."""
+        course_info = {}
+        invalid_courses = []
+        missing = []
+
+        for code in dict.fromkeys(codes):
+            cached = self.course_cache.get(code)
+            if cached is MISSING:
+                missing.append(code)
+            elif cached is None:
+                invalid_courses.append(code)
+            else:
+                course_info[code] = cached
+
+        if missing:
+            try:
+                with telemetry.span('course_retrieve', collection='courses'):
+                    fetched = await self.validate_and_get_courses(missing)
+            except Exception as e:
+                # Don't cache anything on a failed lookup, the codes may be valid
+                print(f"Error fetching courses {missing}: {e}")
+                telemetry.record_error('course_retrieve', e, collection='courses')
+                return course_info, invalid_courses + missing
+
+            for code in missing:
+                if code in fetched:
+                    processed_info = process_course_info(fetched[code])
+                    course_info[code] = processed_info
+                    self.course_cache.set(code, processed_info)
+                else:
+                    invalid_courses.append(code)
+                    self.course_cache.set(code, None, ttl=COURSE_NEGATIVE_TTL)
+
+        return course_info, invalid_courses
+
+    async def stream_completion(self, prompt: str,
+                                on_complete: Optional[Callable[[str], None]] = None) -> AsyncIterator[str]:
+        """Stream the completion for a prompt chunk by chunk as Groq generates it.
+
+        on_complete receives the full text once the stream finishes without errors.
+        The time to first token is recorded on the current trace, token usage by the gateway.
+        """
+        chunks = []
+        start = time.time()
+        try:
+            with telemetry.span('completion'):
+                async with aclosing(self.llm.stream(
+                    messages=[{"role": "user", "content": prompt}],
+                    temperature=0.7,
+                    max_tokens=1000
+                )) as stream:
+                    async for content in stream:
+                        if not chunks:
+                            telemetry.metrics.observe('first_token', time.time() - start)
+                            telemetry.note('first_token_ms', round((time.time() - start) * 1000, 1))
+                        chunks.append(content)
+                        yield content
+        except Exception as e:
+            print(f"Error in chat completion: {e}")
+            telemetry.record_error('completion', e)
+            yield "I am being rate limited. Ask Shaurya to fix me up."
+            return
+
+        if on_complete:
+            on_complete("".join(chunks))
+
+    async def summarize(self, conversation: Conversation) -> None:
+        """Fold everything but the latest exchange into the conversation's summary, with the cheap model."""
+        while (pending := conversation.pending_summary()) is not None:
+            summary, messages, target = pending
+            try:
+                with telemetry.span('summarize'):
+                    # Summaries only use budget the answers can spare, and never queue for it
+                    response = await self.llm.complete(
+                        messages=[{"role": "user", "content": summary_prompt(summary, messages)}],
+                        models=[FALLBACK_MODEL],
+                        background=True,
+                        temperature=0.2,
+                        max_tokens=SUMMARY_MAX_TOKENS
+                    )
+            except Exception as e:
+                # The unsummarized messages stay in the prompt until a later turn succeeds
+                print(f"Error summarizing conversation: {e}")
+                telemetry.record_error('summarize', e)
+                return
+            conversation.update_summary(response.choices[0].message.content.strip(), target)
+
+    def remember(self, conversation: Conversation, query: str, answer: str) -> None:
+        """Record an exchange and refresh the summary in the background, outside the request's trace."""
+        conversation.add_exchange(query, answer)
+        if conversation.summarizing is None or conversation.summarizing.done():
+            conversation.summarizing = asyncio.get_running_loop().create_task(
+                self.summarize(conversation), context=contextvars.Context()
+            )
+
+    async def chat(self, query: str, conversation: Optional[Conversation] = None,
+                   trace: Optional[telemetry.Trace] = None) -> AsyncIterator[str]:
+        """Answer a query in the context of a conversation, streaming the answer.
+
+        The exchange is added to the conversation once the answer has been
+        streamed in full; a failed completion's apology is not. The request's
+        trace is exported either way.
+        """
+        trace = telemetry.start_trace(query, trace)
+        answers = []
+        try:
+            # aclosing passes a client disconnect down to the gateway, which then stops generating
+            async with aclosing(self._chat(query, conversation, answers.append)) as chunks:
+                async for chunk in chunks:
+                    yield chunk
+            if conversation is not None and answers:
+                self.remember(conversation, query, answers[0])
+        finally:
+            telemetry.finish_trace(trace, TRACE_LOG_PATH, METRICS_PATH)
+
+    async def _chat(self, query: str, conversation: Optional[Conversation],
+                    on_answer: Callable[[str], None]) -> AsyncIterator[str]:
+        """The pipeline behind chat(), run inside the request's trace.
+
+        on_answer receives the full answer, only if there is one.
+        """
+        # Course codes, collection keywords and clubs come out of one scan of the query
+        analysis = analyze_query(query, self.departments())
+        with telemetry.span('resolve_codes'):
+            course_codes, unknown_courses, course_suggestions = self.resolve_course_codes(analysis.course_codes)
+
+        clubs_info = club_context(analysis.clubs)
+
+        # Slot, credit, instructor, department and level constraints become payload filters
+        course_plan = plan_course_query(query, self.departments())
+        course_filters = course_plan.describe() if course_plan else ""
+
+        query_vector = await self.encode(query)
+
+        # Near-duplicate questions about the same courses and constraints get the
+        # cached answer. Follow-ups depend on their conversation, so only opening
+        # questions are looked up and stored
+        cacheable = conversation is None or not conversation.started()
+        cache_tag = frozenset(course_codes + unknown_courses + ([course_filters] if course_plan else []))
+        cached_response = None
+        if cacheable:
+            with telemetry.span('response_cache'):
+                cached_response = self.response_cache.get(query_vector, tag=cache_tag)
+        if cached_response is not None:
+            telemetry.count('response_cache_hit')
+            yield cached_response
+            on_answer(cached_response)
+            return
+
+        filters_matched = False
+        if SPECULATIVE_RETRIEVAL:
+            # Intent analysis, course lookups and searches over every collection are
+            # independent, so run them together and discard unselected collections.
+            # A filtered course query replaces the unfiltered courses search.
+            searched = set(COLLECTIONS) - {'courses'} if course_plan else set(COLLECTIONS)
+            tasks = [
+                self.route_query_intent(query, query_vector),
+                self.fetch_from_collections(query, searched, query_vector=query_vector),
+                self.lookup_courses(course_codes),
+            ]
+            if course_plan:
+                tasks.append(self.fetch_filtered_courses(query, course_plan, query_vector))
+            results = await asyncio.gather(*tasks)
+            intent_scores, all_results, (course_info, invalid_courses) = results[:3]
+            relevant_collections = select_collections(analysis.collections, intent_scores)
+            if course_plan and (course_plan.listing or 'courses' in relevant_collections):
+                relevant_collections.add('courses')
+                all_results['courses'], filters_matched = results[3]
+            collection_results = {
+                collection: all_results.get(collection, [])
+                for collection in relevant_collections
+            }
+        else:
+            course_info, invalid_courses = await self.lookup_courses(course_codes)
+            # Determine collections to search
+            relevant_collections = await self.determine_query_type(query, query_vector, analysis)
+            filtered = bool(course_plan) and (course_plan.listing or 'courses' in relevant_collections)
+            collection_results = await self.fetch_from_collections(
+                query, relevant_collections - {'courses'} if filtered else relevant_collections,
+                query_vector=query_vector
+            )
+            if filtered:
+                relevant_collections.add('courses')
+                collection_results['courses'], filters_matched = await self.fetch_filtered_courses(
+                    query, course_plan, query_vector
+                )
+        # A credit, slot or level mention alone doesn't make a question about
+        # courses, so the constraints only apply when courses were selected anyway
+        # or a list was asked for, and the prompt only states them if they matched
+        if not filters_matched:
+            course_filters = ""
+        invalid_courses = unknown_courses + invalid_courses
+
+        with telemetry.span('build_context'):
+            history_context = conversation.history_block(HISTORY_TOKEN_BUDGET) if conversation else ""
+            context, context_tokens = build_context(course_info, collection_results, CONTEXT_TOKEN_BUDGET)
+            prompt = build_prompt(
+                query, relevant_collections, course_info, invalid_courses, course_suggestions,
+                course_filters, clubs_info, history_context, context
+            )
+        telemetry.count('context_tokens', context_tokens)
+        telemetry.note('history_tokens', estimate_tokens(history_context))
+        telemetry.note('prompt_tokens_estimate', estimate_tokens(prompt))
+
+        def on_complete(response: str) -> None:
+            if cacheable:
+                self.response_cache.set(query_vector, response, tag=cache_tag)
+            on_answer(response)
+
+        async with aclosing(self.stream_completion(prompt, on_complete=on_complete)) as chunks:
+            async for chunk in chunks:
+                yield chunk
+
+
+
+class BackgroundNavigator:
+    """Runs a Navigator on an event loop in a background thread, for synchronous callers like Streamlit."""
+
+    _DONE = object()
+
+    def __init__(self, navigator: Navigator):
+        self.navigator = navigator
+        self.loop = asyncio.new_event_loop()
+        self.thread = threading.Thread(target=self.loop.run_forever, name="navigator-loop", daemon=True)
+        self.thread.start()
+
+    def chat(self, query: str, conversation: Optional[Conversation] = None,
+             trace: Optional[telemetry.Trace] = None) -> Iterator[str]:
+        """Navigator.chat as a blocking iterator of chunks."""
+        chunks = queue.Queue()
+
+        # The whole answer is produced by one task so the trace context holds
+        # across chunks; the caller's thread only waits on the queue
+        async def pump():
+            try:
+                async for chunk in self.navigator.chat(query, conversation, trace):
+                    chunks.put(chunk)
+            finally:
+                chunks.put(self._DONE)
+
+        future = asyncio.run_coroutine_threadsafe(pump(), self.loop)
+        while (chunk := chunks.get()) is not self._DONE:
+            yield chunk
+        future.result()
@@ -0,0 +1,128 @@
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+
+# Weight of relevance against novelty when picking hits; 1.0 is plain ranking.
+# Relevance is min-max scaled over the candidates, so a near-duplicate (cosine
+# ~0.99) of the top hit loses to a distinct hit one rank below it, while
+# on-topic hits that are merely alike (cosine ~0.9) keep their order
+MMR_LAMBDA = 0.75
+
+# The inception and united chunkers step 500 characters with a 1000-character
+# window, so consecutive chunks share up to 500 characters; interview chunks
+# share 50 words. Overlaps are looked for this far back from a chunk's end
+MAX_OVERLAP_CHARS = 1000
+
+# Characters of a chunk's start searched for in the previous chunk's tail
+OVERLAP_PROBE_CHARS = 40
+
+
+def chunk_position(collection: str, payload: Dict) -> Optional[Tuple[str, int, bool]]:
+    """Where a hit sits in its source: (source, index, whether the source is a single document).
+
+    Magazine chunks are numbered across every issue, so neighbouring numbers
+    are only the same text if their contents overlap. Interview chunks carry
+    their document.
+    """
+    if collection == 'interviews':
+        if payload.get('original_doc_id') is None or payload.get('chunk_index') is None:
+            return None
+        return f"interviews:{payload['original_doc_id']}", int(payload['chunk_index']), True
+    if collection in ('inception', 'united') and payload.get('chunk_id') is not None:
+        return collection, int(payload['chunk_id']), False
+    return None
+
+def text_field(payload: Dict) -> str:
+    return 'text' if 'text' in payload else 'data'
+
+def find_overlap(first: str, second: str) -> int:
+    """Length of the longest end of first that second starts with, or 0."""
+    probe = second[:OVERLAP_PROBE_CHARS]
+    if not probe:
+        return 0
+    start = max(0, len(first) - MAX_OVERLAP_CHARS)
+    while (position := first.find(probe, start)) != -1:
+        if second.startswith(first[position:]):
+            return len(first) - position
+        start = position + 1
+    return 0
+
+def merge_pair(first: Dict, second: Dict, same_document: bool) -> Optional[Dict]:
+    """One hit spanning two consecutive chunks, or None if they aren't contiguous text."""
+    field = text_field(first['payload'])
+    first_text = str(first['payload'].get(field, "")).strip()
+    second_text = str(second['payload'].get(field, "")).strip()
+    overlap = find_overlap(first_text, second_text)
+    if overlap:
+        text = first_text + second_text[overlap:]
+    elif same_document:
+        text = first_text + " " + second_text
+    else:
+        return None
+
+    vectors = [hit['vector'] for hit in (first, second) if hit.get('vector') is not None]
+    return {
+        'id': first['id'],
+        'score': max(first['score'], second['score']),
+        'payload': {**first['payload'], field: text,
+                    'merged_ids': first['payload'].get('merged_ids', [first['id']]) + [second['id']]},
+        'vector': np.mean(vectors, axis=0) if vectors else None,
+    }
+
+def merge_adjacent(collection: str, hits: List[Dict]) -> List[Dict]:
+    """Merge hits that are consecutive chunks of the same source into single spans, best score first."""
+    positioned, merged = {}, []
+    for hit in hits:
+        position = chunk_position(collection, hit['payload'] or {})
+        if position is None:
+            merged.append(hit)
+        else:
+            positioned.setdefault(position[0], []).append((position[1], position[2], hit))
+
+    for chunks in positioned.values():
+        chunks.sort(key=lambda chunk: chunk[0])
+        index, same_document, span = chunks[0]
+        for next_index, _, hit in chunks[1:]:
+            combined = merge_pair(span, hit, same_document) if next_index == index + 1 else None
+            if combined is None:
+                merged.append(span)
+                span = hit
+            else:
+                span = combined
+            index = next_index
+        merged.append(span)
+
+    return sorted(merged, key=lambda hit: hit['score'], reverse=True)
+
+def mmr(hits: List[Dict], k: int, weight: float = MMR_LAMBDA) -> List[Dict]:
+    """Pick k hits by maximal marginal relevance: score against cosine similarity to the hits already picked.
+
+    Scores are scaled to 0-1 across the hits first, since fused rank scores sit
+    in a narrow band that novelty would otherwise outweigh. Hits without a
+    vector, or pointing away from the picked ones, count as unlike them.
+    """
+    if len(hits) <= k:
+        return hits
+    dimension = next((len(hit['vector']) for hit in hits if hit.get('vector') is not None), 0)
+    if not dimension:
+        return hits[:k]
+
+    vectors = np.array([hit['vector'] if hit.get('vector') is not None else np.zeros(dimension) for hit in hits],
+                       dtype=np.float32)
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    vectors = vectors / np.where(norms == 0, 1, norms)
+    similarity = np.clip(vectors @ vectors.T, 0, None)
+    scores = np.array([hit['score'] for hit in hits], dtype=np.float32)
+    spread = scores.max() - scores.min()
+    relevance = (scores - scores.min()) / spread if spread > 0 else np.ones_like(scores)
+
+    selected = [int(np.argmax(relevance))]
+    redundancy = similarity[selected[0]].copy()
+    while len(selected) < k:
+        marginal = weight * relevance - (1 - weight) * redundancy
+        marginal[selected] = -np.inf
+        best = int(np.argmax(marginal))
+        selected.append(best)
+        redundancy = np.maximum(redundancy, similarity[best])
+    return [hits[index] for index in selected]
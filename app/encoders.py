@@ -0,0 +1,109 @@
+import os
+from typing import List, Union
+
+import numpy as np
+
+from caching import MISSING, TTLCache
+
+
+MODEL_NAME = 'all-MiniLM-L6-v2'
+MODEL_REPO = 'sentence-transformers/all-MiniLM-L6-v2'
+
+# int8 export shipped in the model repo; quint8 AVX2 runs on any recent x86 CPU
+ONNX_FILE = 'onnx/model_quint8_avx2.onnx'
+MAX_SEQ_LENGTH = 256
+
+
+class OnnxEncoder:
+    """CPU encoder running a quantized ONNX export of all-MiniLM-L6-v2.
+
+    Reproduces the sentence-transformers pipeline (mean pooling followed by L2
+    normalization), so its vectors can be searched against the existing
+    collections. Needs onnxruntime and tokenizers but not torch.
+    """
+
+    def __init__(self, model_path: str = None, tokenizer_path: str = None, threads: int = 0):
+        try:
+            import onnxruntime
+            from tokenizers import Tokenizer
+        except ImportError as e:
+            raise ImportError("The onnx encoder backend needs `pip install onnxruntime tokenizers`") from e
+
+        if model_path is None or tokenizer_path is None:
+            from huggingface_hub import hf_hub_download
+            model_path = model_path or hf_hub_download(MODEL_REPO, ONNX_FILE)
+            tokenizer_path = tokenizer_path or hf_hub_download(MODEL_REPO, 'tokenizer.json')
+
+        options = onnxruntime.SessionOptions()
+        options.intra_op_num_threads = threads
+        self.session = onnxruntime.InferenceSession(
+            model_path, options, providers=['CPUExecutionProvider']
+        )
+        self.input_names = {model_input.name for model_input in self.session.get_inputs()}
+
+        self.tokenizer = Tokenizer.from_file(tokenizer_path)
+        self.tokenizer.enable_truncation(max_length=MAX_SEQ_LENGTH)
+        self.tokenizer.enable_padding()
+
+    def encode(self, sentences: Union[str, List[str]], normalize_embeddings: bool = True,
+               batch_size: int = 32, **kwargs) -> np.ndarray:
+        single = isinstance(sentences, str)
+        if single:
+            sentences = [sentences]
+
+        batches = []
+        for start in range(0, len(sentences), batch_size):
+            encodings = self.tokenizer.encode_batch(sentences[start:start + batch_size])
+            input_ids = np.array([encoding.ids for encoding in encodings], dtype=np.int64)
+            attention_mask = np.array([encoding.attention_mask for encoding in encodings], dtype=np.int64)
+            inputs = {'input_ids': input_ids, 'attention_mask': attention_mask}
+            if 'token_type_ids' in self.input_names:
+                inputs['token_type_ids'] = np.zeros_like(input_ids)
+
+            token_embeddings = self.session.run(None, inputs)[0]
+            mask = attention_mask[..., None].astype(np.float32)
+            pooled = (token_embeddings * mask).sum(axis=1) / np.clip(mask.sum(axis=1), 1e-9, None)
+            # The model's sentence-transformers pipeline ends in a Normalize layer
+            batches.append(pooled / np.linalg.norm(pooled, axis=1, keepdims=True))
+
+        embeddings = np.concatenate(batches).astype(np.float32)
+        return embeddings[0] if single else embeddings
+
+    def get_sentence_embedding_dimension(self) -> int:
+        return self.session.get_outputs()[0].shape[-1] or 384
+
+
+class CachedEncoder:
+    """Wraps an encoder with an LRU of recent single-query embeddings."""
+
+    def __init__(self, encoder, max_size: int = 4096):
+        self.encoder = encoder
+        self.cache = TTLCache(max_size=max_size, ttl=float('inf'))
+
+    def encode(self, sentences, **kwargs):
+        if not isinstance(sentences, str) or kwargs:
+            return self.encoder.encode(sentences, **kwargs)
+        embedding = self.cache.get(sentences)
+        if embedding is MISSING:
+            embedding = self.encoder.encode(sentences)
+            embedding.flags.writeable = False
+            self.cache.set(sentences, embedding)
+        return embedding
+
+    def __getattr__(self, name):
+        return getattr(self.encoder, name)
+
+
+def load_encoder(backend: str = 'torch', cache_size: int = 4096):
+    """Load the query encoder for a backend ('torch' or 'onnx') behind an embedding LRU."""
+    if backend == 'onnx':
+        encoder = OnnxEncoder(
+            model_path=os.environ.get('ENCODER_ONNX_PATH'),
+            tokenizer_path=os.environ.get('ENCODER_TOKENIZER_PATH')
+        )
+    elif backend == 'torch':
+        from sentence_transformers import SentenceTransformer
+        encoder = SentenceTransformer(MODEL_NAME)
+    else:
+        raise ValueError(f"Unknown encoder backend: {backend}")
+    return CachedEncoder(encoder, max_size=cache_size) if cache_size else encoder
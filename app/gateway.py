@@ -0,0 +1,371 @@
+import time
+import json
+import random
+import asyncio
+import hashlib
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
+
+import groq as groq_errors
+
+from context import estimate_tokens
+import telemetry
+
+# Errors worth retrying: throttling, dropped connections and Groq-side failures
+RETRYABLE_ERRORS = (groq_errors.RateLimitError, groq_errors.APIConnectionError, groq_errors.InternalServerError)
+
+
+def prompt_text(messages: List[Dict[str, str]]) -> str:
+    return " ".join(message['content'] for message in messages)
+
+
+class TokenBucket:
+    """Refills at `rate` units per second up to `capacity`; acquire() waits for enough units.
+
+    Waiters are served in arrival order. Used for both request and token budgets.
+    """
+
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = capacity
+        self.available = capacity
+        self.updated = time.monotonic()
+        self.lock = asyncio.Lock()
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self.available = min(self.capacity, self.available + (now - self.updated) * self.rate)
+        self.updated = now
+
+    async def acquire(self, amount: float, timeout: Optional[float] = None) -> bool:
+        """Take amount units, waiting up to timeout seconds (forever if None); False if it would take longer."""
+        amount = min(amount, self.capacity)
+        deadline = None if timeout is None else time.monotonic() + timeout
+        async with self.lock:
+            while True:
+                self._refill()
+                if self.available >= amount:
+                    self.available -= amount
+                    return True
+                wait = (amount - self.available) / self.rate
+                if deadline is not None and time.monotonic() + wait > deadline:
+                    return False
+                await asyncio.sleep(wait)
+
+    def try_acquire(self, amount: float, keep: float = 0.0) -> bool:
+        """Take amount units only if no one is waiting and at least keep units would be left."""
+        if self.lock.locked():
+            return False
+        self._refill()
+        if self.available - min(amount, self.capacity) < keep:
+            return False
+        self.available -= min(amount, self.capacity)
+        return True
+
+    def release(self, amount: float) -> None:
+        """Give back units taken for a request that never went out or needed fewer; negative amounts take more."""
+        self._refill()
+        self.available = min(self.capacity, self.available + amount)
+
+    def drain(self) -> None:
+        """Empty the bucket after the server throttled us, so queued requests back off too."""
+        self._refill()
+        self.available = 0.0
+
+
+class ModelQuota:
+    """Client-side request and token budget for one model, per minute."""
+
+    def __init__(self, requests_per_minute: float, tokens_per_minute: float):
+        self.requests = TokenBucket(requests_per_minute / 60, requests_per_minute)
+        self.tokens = TokenBucket(tokens_per_minute / 60, tokens_per_minute)
+
+    async def acquire(self, tokens: float, timeout: Optional[float] = None) -> bool:
+        if not await self.requests.acquire(1, timeout):
+            return False
+        if not await self.tokens.acquire(tokens, timeout):
+            self.requests.release(1)
+            return False
+        return True
+
+    def try_acquire(self, tokens: float, headroom: float) -> bool:
+        """Take budget without waiting, only while the headroom fraction of both budgets would stay free."""
+        if not self.requests.try_acquire(1, self.requests.capacity * headroom):
+            return False
+        if not self.tokens.try_acquire(tokens, self.tokens.capacity * headroom):
+            self.requests.release(1)
+            return False
+        return True
+
+    def settle(self, reserved: float, used: float) -> None:
+        """Refund the tokens a request reserved but didn't use, or charge what it used beyond the reservation."""
+        self.tokens.release(min(reserved, self.tokens.capacity) - used)
+
+    def drain(self) -> None:
+        self.requests.drain()
+        self.tokens.drain()
+
+
+async def close_response(response) -> None:
+    """Close an upstream completion stream; Groq's close() drops the HTTP response, which stops generation."""
+    close = getattr(response, 'close', None) or getattr(response, 'aclose', None)
+    if close is not None:
+        await close()
+
+
+class _SharedStream:
+    """One upstream completion stream replayed to every caller that asked for the same prompt.
+
+    subscribers counts the callers still reading; when the last one leaves
+    early, the publishing task is cancelled.
+    """
+
+    def __init__(self):
+        self.chunks: List[str] = []
+        self.done = False
+        self.error: Optional[BaseException] = None
+        self.changed = asyncio.Condition()
+        self.subscribers = 0
+        self.task: Optional[asyncio.Task] = None
+
+    async def publish(self, source: AsyncIterator[str]) -> None:
+        try:
+            async for chunk in source:
+                async with self.changed:
+                    self.chunks.append(chunk)
+                    self.changed.notify_all()
+        except BaseException as e:
+            self.error = e
+        finally:
+            # Runs the source's cleanup now rather than whenever it is garbage collected
+            await source.aclose()
+            async with self.changed:
+                self.done = True
+                self.changed.notify_all()
+
+    async def subscribe(self) -> AsyncIterator[str]:
+        index = 0
+        while True:
+            async with self.changed:
+                await self.changed.wait_for(lambda: index < len(self.chunks) or self.done)
+                chunks = self.chunks[index:]
+                done = self.done
+            for chunk in chunks:
+                yield chunk
+            index += len(chunks)
+            if done and index >= len(self.chunks):
+                if self.error is not None:
+                    raise self.error
+                return
+
+
+class LLMGateway:
+    """The one way the navigator talks to Groq.
+
+    Every call passes through a client-side request and token budget per model,
+    retries throttling and transient errors with jittered exponential backoff
+    (honouring Retry-After), and falls back to the next model when the primary
+    is saturated. Identical prompts already in flight are coalesced into a
+    single upstream call. Background calls never queue and only take budget
+    while background_headroom of it would stay free, so they can't starve
+    the user-facing ones.
+    """
+
+    def __init__(self, client, models: List[Tuple[str, float, float]], max_retries: int = 3,
+                 base_delay: float = 0.5, max_delay: float = 8.0, max_queue_wait: float = 2.0,
+                 background_headroom: float = 0.5):
+        """models lists (name, requests per minute, tokens per minute), primary first."""
+        self.client = client
+        self.models = [name for name, _, _ in models]
+        self.quotas = {name: ModelQuota(rpm, tpm) for name, rpm, tpm in models}
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.max_queue_wait = max_queue_wait
+        self.background_headroom = background_headroom
+        self.queued = 0
+        self.in_flight: Dict[str, Any] = {}
+
+        telemetry.metrics.gauge('llm_queue_depth', lambda: self.queued)
+        telemetry.metrics.gauge('llm_in_flight', lambda: len(self.in_flight))
+
+    @staticmethod
+    def _key(messages: List[Dict[str, str]], kwargs: Dict[str, Any]) -> str:
+        data = json.dumps([messages, kwargs], sort_keys=True, default=str)
+        return hashlib.sha256(data.encode('utf-8')).hexdigest()
+
+    async def _reserve(self, model: str, tokens: float, last: bool, background: bool = False) -> bool:
+        """Wait for budget on a model; only the last model waits as long as it takes, background calls not at all."""
+        if background:
+            return self.quotas[model].try_acquire(tokens, self.background_headroom)
+        self.queued += 1
+        start = time.monotonic()
+        try:
+            granted = await self.quotas[model].acquire(tokens, None if last else self.max_queue_wait)
+        finally:
+            self.queued -= 1
+        waited = time.monotonic() - start
+        if waited > 0.01:
+            telemetry.metrics.increment('llm_throttled', model=model)
+            telemetry.metrics.observe('llm_queue_wait', waited, model=model)
+        return granted
+
+    def _backoff(self, attempt: int, error: Exception) -> float:
+        response = getattr(error, 'response', None)
+        retry_after = response.headers.get('retry-after') if response is not None else None
+        try:
+            return min(self.max_delay, float(retry_after))
+        except (TypeError, ValueError):
+            return random.uniform(0, min(self.max_delay, self.base_delay * 2 ** attempt))
+
+    async def _call(self, messages: List[Dict[str, str]], kwargs: Dict[str, Any], first_chunk: bool,
+                    models: Optional[List[str]] = None, background: bool = False):
+        """Make one request, trying each model (of models, if given) in turn; returns (model, response, tokens).
+
+        tokens is the budget reserved on the model: the prompt estimate plus
+        max_tokens, to be settled against the actual usage with _settle. For
+        streams, the first chunk is awaited inside the retry loop, since a
+        throttled stream fails before producing anything.
+        """
+        tokens = estimate_tokens(prompt_text(messages)) + kwargs.get('max_tokens', 0)
+        models = models or self.models
+        for index, model in enumerate(models):
+            last = index == len(models) - 1
+            if not await self._reserve(model, tokens, last, background):
+                telemetry.metrics.increment('llm_fallbacks', model=model, reason='budget')
+                continue
+            try:
+                for attempt in range(self.max_retries + 1):
+                    try:
+                        response = await self.client.chat.completions.create(model=model, messages=messages,
+                                                                              **kwargs)
+                        if first_chunk:
+                            chunks = response.__aiter__()
+                            try:
+                                return model, (await chunks.__anext__(), chunks, response), tokens
+                            except StopAsyncIteration:
+                                return model, (None, chunks, response), tokens
+                        return model, response, tokens
+                    except RETRYABLE_ERRORS as e:
+                        throttled = isinstance(e, groq_errors.RateLimitError)
+                        telemetry.metrics.increment('llm_errors', model=model, kind=type(e).__name__)
+                        if throttled:
+                            self.quotas[model].drain()
+                        # Throttled background calls give up rather than add to the pressure
+                        if attempt == self.max_retries or (throttled and (background or not last)):
+                            if not last:
+                                telemetry.metrics.increment('llm_fallbacks', model=model, reason=type(e).__name__)
+                                break
+                            raise
+                        telemetry.metrics.increment('llm_retries', model=model)
+                        await asyncio.sleep(self._backoff(attempt, e))
+                        # Every retry is another request against the per-minute limit
+                        self.quotas[model].requests.release(-1)
+            except BaseException as e:
+                # Nothing was generated against the reservation; a 429 already drained the budget
+                if not isinstance(e, groq_errors.RateLimitError):
+                    self.quotas[model].settle(tokens, 0)
+                raise
+            if not throttled:
+                self.quotas[model].settle(tokens, 0)
+        raise RuntimeError("No model has budget left")
+
+    def _settle(self, model: str, reserved: float, usage, prompt: str, completion: str) -> None:
+        """Settle a reservation against the usage Groq reported, or an estimate of it without one."""
+        if usage is not None:
+            used = usage.prompt_tokens + usage.completion_tokens
+        else:
+            used = estimate_tokens(prompt) + estimate_tokens(completion)
+        self.quotas[model].settle(reserved, used)
+
+    async def complete(self, messages: List[Dict[str, str]], models: Optional[List[str]] = None,
+                       background: bool = False, **kwargs) -> Any:
+        """A non-streamed chat completion; identical concurrent requests share one call.
+
+        models restricts the call to some of the gateway's models, e.g. a cheap one for background work.
+        Background calls fail rather than wait when the budget is short.
+        """
+        key = self._key(messages, {**kwargs, 'models': models, 'background': background})
+        if key in self.in_flight:
+            telemetry.metrics.increment('llm_coalesced')
+            return await asyncio.shield(self.in_flight[key])
+
+        future = asyncio.get_running_loop().create_future()
+        self.in_flight[key] = future
+        try:
+            model, response, reserved = await self._call(messages, kwargs, first_chunk=False, models=models,
+                                                         background=background)
+            telemetry.metrics.increment('llm_requests', model=model)
+            self._settle(model, reserved, getattr(response, 'usage', None), prompt_text(messages),
+                         "".join(choice.message.content or "" for choice in response.choices))
+            future.set_result(response)
+            return response
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except Exception as e:
+            future.set_exception(e)
+            # Mark the exception retrieved in case nobody else was waiting
+            future.exception()
+            raise
+        finally:
+            del self.in_flight[key]
+
+    async def stream(self, messages: List[Dict[str, str]], **kwargs) -> AsyncIterator[str]:
+        """Stream a chat completion's text; identical concurrent prompts share one upstream stream.
+
+        Token usage is counted on the trace of the caller that started the stream.
+        """
+        key = self._key(messages, kwargs)
+        shared = self.in_flight.get(key)
+        if shared is not None:
+            telemetry.metrics.increment('llm_coalesced')
+        else:
+            shared = _SharedStream()
+            self.in_flight[key] = shared
+            shared.task = asyncio.get_running_loop().create_task(shared.publish(self._stream(messages, kwargs)))
+            shared.task.add_done_callback(lambda _: self._forget_stream(key, shared))
+        shared.subscribers += 1
+        try:
+            async for chunk in shared.subscribe():
+                yield chunk
+        finally:
+            shared.subscribers -= 1
+            if not shared.subscribers and not shared.done:
+                # Every caller went away; stop generating and don't let new callers join
+                self._forget_stream(key, shared)
+                shared.task.cancel()
+
+    def _forget_stream(self, key: str, shared: _SharedStream) -> None:
+        if self.in_flight.get(key) is shared:
+            del self.in_flight[key]
+
+    async def _stream(self, messages: List[Dict[str, str]], kwargs: Dict[str, Any]) -> AsyncIterator[str]:
+        model, (first, chunks, response), reserved = await self._call(messages, {**kwargs, 'stream': True},
+                                                                      first_chunk=True)
+        telemetry.metrics.increment('llm_requests', model=model)
+        telemetry.note('llm_model', model)
+        prompt = prompt_text(messages)
+        parts = []
+        usage = None
+        chunk = first
+        try:
+            while chunk is not None:
+                # Groq reports token usage on the last chunk
+                x_groq = getattr(chunk, 'x_groq', None)
+                if x_groq is not None and getattr(x_groq, 'usage', None):
+                    usage = x_groq.usage
+                content = chunk.choices[0].delta.content if chunk.choices else None
+                if content:
+                    parts.append(content)
+                    yield content
+                try:
+                    chunk = await chunks.__anext__()
+                except StopAsyncIteration:
+                    chunk = None
+        finally:
+            # Also settled when the stream breaks off, against what was generated so far
+            self._settle(model, reserved, usage, prompt, "".join(parts))
+            await close_response(response)
+
+        telemetry.count('prompt_tokens', usage.prompt_tokens if usage else estimate_tokens(prompt))
+        telemetry.count('completion_tokens', usage.completion_tokens if usage else estimate_tokens("".join(parts)))
@@ -0,0 +1,172 @@
+import json
+from typing import List, Dict, Tuple
+
+import numpy as np
+
+
+# Qdrant collections the navigator can draw context from
+COLLECTIONS = ['courses', 'interviews', 'inception', 'united']
+
+# Labelled example queries per collection, used to build the router prototypes
+ROUTE_EXAMPLES = {
+    'courses': [
+        "how is COL106",
+        "is MTL100 a tough course",
+        "what are the prerequisites for COL331",
+        "which prof is taking ELL101 this sem",
+        "how many credits is APL100",
+        "what slot is CML101 in",
+        "study material for data structures",
+        "best books for linear algebra",
+        "is the grading in MTL106 chill",
+        "which electives are easy to score in",
+        "lecture timings for the signals course",
+        "does COL215 overlap with ELL201",
+        "how to prepare for the minor exams",
+        "what is taught in the intro to programming course",
+    ],
+    'interviews': [
+        "how to prepare for quant interviews",
+        "which companies come for placements",
+        "how to get an internship in second year",
+        "resume tips for the intern season",
+        "what do they ask in the goldman sachs interview",
+        "how to crack a product management role",
+        "is competitive programming needed for SDE jobs",
+        "how did seniors prepare for consulting interviews",
+        "what is the placement scene for civil engineering",
+        "should I do a research intern or a corporate intern",
+        "how many rounds are there in the trading firm interviews",
+        "how to prepare for data science roles",
+    ],
+    'inception': [
+        "which hostel has the best mess food",
+        "where is the LHC",
+        "what is there to do at SAC",
+        "best canteens on campus",
+        "how do freshers get around campus",
+        "what is the OAT used for",
+        "what happens during orientation week",
+        "is there a gym in the hostel",
+        "how does the hostel allotment work",
+        "what is the nightlife near campus like",
+        "where do people hang out late at night",
+        "what should a faccha bring to IITD",
+        "what is rdv",
+        "how does the mess rebate work",
+    ],
+    'united': [
+        "how is the dating scene at IITD",
+        "how to talk to my crush",
+        "how to get over a breakup",
+        "latest campus gossip",
+        "how to make friends in first year",
+        "is it hard to find a relationship here",
+        "how do people deal with being devdass",
+        "what do students do on weekends together",
+        "stories from senior students about campus life",
+        "how to handle loneliness in college",
+        "how to rizz someone up at a fest",
+        "what is the social scene in the hostels",
+    ],
+}
+
+
+class IntentRouter:
+    """Scores collection relevance locally from query embeddings.
+
+    Each collection is represented by the normalized centroid of its example
+    embeddings; a query is scored with one matrix-vector product followed by a
+    softmax over the collections.
+    """
+
+    def __init__(self, encoder, examples: Dict[str, List[str]] = ROUTE_EXAMPLES, temperature: float = 0.05):
+        self.collections = list(examples.keys())
+        self.temperature = temperature
+        centroids = []
+        for collection in self.collections:
+            vectors = encoder.encode(examples[collection], normalize_embeddings=True)
+            centroid = np.mean(vectors, axis=0)
+            centroids.append(centroid / np.linalg.norm(centroid))
+        self.prototypes = np.stack(centroids)
+
+    def score(self, query_vector) -> Tuple[Dict[str, float], float]:
+        """Return per-collection relevance scores and the router's confidence."""
+        vector = np.asarray(query_vector, dtype=np.float32)
+        vector = vector / (np.linalg.norm(vector) or 1.0)
+        similarities = self.prototypes @ vector
+        logits = (similarities - similarities.max()) / self.temperature
+        probabilities = np.exp(logits) / np.exp(logits).sum()
+        scores = {
+            collection: float(probability)
+            for collection, probability in zip(self.collections, probabilities)
+        }
+        return scores, float(probabilities.max())
+
+
+def intent_prompt(query: str) -> str:
+    """Prompt asking the LLM for per-collection relevance scores as JSON."""
+    return f"""Analyze this query and assign relevance scores from 0 to 1 for each collection.
+Return only a JSON object with the scores in this exact format:
+{{
+    "courses": 0.0,
+    "interviews": 0.0,
+    "inception": 0.0,
+    "united": 0.0
+}}
+
+Query: {query}
+
+Consider:
+- courses: academic queries, study materials
+- interviews: career guidance, placements
+- inception: IITD culture, campus life
+- united: social interactions, student community
+
+Ensure responses are **concise and to the point** while retaining key details. Avoid excessive elaboration.
+"""
+
+def parse_intent_scores(content: str) -> Dict[str, float]:
+    """Clamp the LLM's JSON scores to [0, 1], defaulting unreadable ones to 0.25."""
+    scores = json.loads(content)
+
+    validated_scores = {}
+    for collection in COLLECTIONS:
+        try:
+            score = float(scores.get(collection, 0.0))
+            validated_scores[collection] = max(0.0, min(1.0, score))
+        except (TypeError, ValueError):
+            validated_scores[collection] = 0.25
+
+    return validated_scores
+
+def llm_intent_scores(groq, model: str, query: str) -> Dict[str, float]:
+    """Analyze query intent with the LLM and assign collection relevance scores."""
+    try:
+        response = groq.chat.completions.create(
+            model=model,
+            messages=[{"role": "user", "content": intent_prompt(query)}],
+            temperature=0.1,
+            max_tokens=100,
+            response_format={ "type": "json_object" }
+        )
+        return parse_intent_scores(response.choices[0].message.content)
+
+    except Exception as e:
+        print(f"Error in analyze_query_intent: {e}")
+        return {collection: 0.25 for collection in COLLECTIONS}
+
+async def llm_intent_scores_async(gateway, query: str) -> Dict[str, float]:
+    """llm_intent_scores through the async LLM gateway, which picks the model."""
+    try:
+        response = await gateway.complete(
+            messages=[{"role": "user", "content": intent_prompt(query)}],
+            temperature=0.1,
+            max_tokens=100,
+            response_format={ "type": "json_object" }
+        )
+        return parse_intent_scores(response.choices[0].message.content)
+
+    except Exception as e:
+        print(f"Error in analyze_query_intent: {e}")
+        return {collection: 0.25 for collection in COLLECTIONS}
@@ -0,0 +1,59 @@
+import re
+import zlib
+from collections import Counter
+from typing import List
+
+from qdrant_client import models
+
+
+# Name of the sparse vector stored next to the default dense vector in each collection
+SPARSE_VECTOR_NAME = "bm25"
+
+# BM25 term-frequency saturation; document length normalization is left out
+# (b = 0) and Qdrant's IDF modifier supplies the inverse document frequency
+K1 = 1.2
+
+COURSE_CODE = re.compile(r'\b([A-Za-z]{2,3})[\s-]?(\d{3})\b')
+TOKEN = re.compile(r'[a-z0-9]+')
+STOPWORDS = {
+    'a', 'an', 'and', 'are', 'as', 'at', 'be', 'by', 'do', 'for', 'from', 'how', 'i', 'in', 'is',
+    'it', 'me', 'my', 'of', 'on', 'or', 'so', 'that', 'the', 'this', 'to', 'was', 'what', 'which',
+    'who', 'with', 'you',
+}
+
+
+def tokenize(text: str) -> List[str]:
+    """Lowercase word tokens, with course codes joined so "COL 380" matches "col380"."""
+    text = COURSE_CODE.sub(lambda match: match.group(1) + match.group(2), text).lower()
+    return [token for token in TOKEN.findall(text) if token not in STOPWORDS]
+
+def token_index(token: str) -> int:
+    """Hash a token into the sparse vector's index space."""
+    return zlib.crc32(token.encode('utf-8'))
+
+def sparse_vector(text: str, query: bool = False) -> models.SparseVector:
+    """BM25-style sparse vector of a text; query vectors weight each distinct term once."""
+    counts = Counter(token_index(token) for token in tokenize(text))
+    indices = sorted(counts)
+    if query:
+        values = [1.0] * len(indices)
+    else:
+        values = [counts[index] * (K1 + 1) / (counts[index] + K1) for index in indices]
+    return models.SparseVector(indices=indices, values=values)
+
+def reciprocal_rank_fusion(result_lists, k: int = 60, normalize: bool = False) -> List:
+    """Fuse ranked lists of scored points into one list of (fused score, point), best first.
+
+    Each point scores sum(1 / (k + rank)) over the lists it appears in. With
+    normalize, scores are divided by the best possible one, first in every
+    non-empty list, so they fall in (0, 1] however many lists were fused.
+    """
+    result_lists = [results for results in result_lists if results]
+    scale = (k + 1) / len(result_lists) if normalize and result_lists else 1.0
+    scores, points = {}, {}
+    for results in result_lists:
+        for rank, point in enumerate(results, start=1):
+            scores[point.id] = scores.get(point.id, 0.0) + 1.0 / (k + rank)
+            points.setdefault(point.id, point)
+    return sorted(((score * scale, points[point_id]) for point_id, score in scores.items()),
+                  key=lambda item: item[0], reverse=True)
@@ -0,0 +1,106 @@
+import asyncio
+import threading
+from typing import Dict, List, Optional, Tuple
+
+from context import estimate_tokens, truncate_to_tokens
+
+# The summary is asked for in at most this many tokens, and cut there if it runs over
+SUMMARY_MAX_TOKENS = 200
+
+# Cap per verbatim message in the prompt; answers run up to 1000 tokens
+MESSAGE_MAX_TOKENS = 250
+
+# Cap per message sent to the summarizer, to keep that call cheap
+SUMMARY_INPUT_MESSAGE_TOKENS = 500
+
+
+def summary_prompt(summary: str, messages: List[Dict[str, str]]) -> str:
+    """Prompt that folds new messages into the running summary."""
+    new_messages = "\n".join(
+        f"{message['role']}: {truncate_to_tokens(message['content'], SUMMARY_INPUT_MESSAGE_TOKENS)}"
+        for message in messages
+    )
+    return f"""Update the running summary of a chat between an IIT Delhi student and the IITD Campus Navigator.
+
+Current summary:
+{summary or "None"}
+
+New messages:
+{new_messages}
+
+Write the updated summary in at most {SUMMARY_MAX_TOKENS * 3 // 4} words. Keep what the student asked about, the courses, profs, clubs, preferences and plans they mentioned, and facts from the answers they may follow up on. Drop greetings and filler. Reply with the summary only."""
+
+
+class Conversation:
+    """Messages of one conversation and a rolling summary of all but the latest exchange.
+
+    The summary is refreshed in the background after each turn (see
+    Navigator.remember), so the conversation block of the prompt stays the same
+    size however long the session runs. The navigator's event loop may run in
+    another thread than the caller's (BackgroundNavigator), so state is read and
+    changed under a lock.
+    """
+
+    def __init__(self):
+        self.messages: List[Dict[str, str]] = []
+        self.summary = ""
+        # messages[:summarized] are folded into the summary
+        self.summarized = 0
+        self.summarizing: Optional[asyncio.Task] = None
+        # Held by the HTTP API for a whole turn, so a session's messages are answered one at a time
+        self.turn_lock = asyncio.Lock()
+        self.lock = threading.Lock()
+
+    def add_exchange(self, query: str, answer: str) -> None:
+        with self.lock:
+            self.messages.extend([{"role": "user", "content": query}, {"role": "assistant", "content": answer}])
+
+    def transcript(self) -> List[Dict[str, str]]:
+        """A copy of the messages, safe to render while the conversation changes."""
+        with self.lock:
+            return list(self.messages)
+
+    def started(self) -> bool:
+        with self.lock:
+            return bool(self.messages or self.summary)
+
+    def pending_summary(self) -> Optional[Tuple[str, List[Dict[str, str]], int]]:
+        """The summary, the messages still to fold into it and the index they end at; None if up to date.
+
+        The latest exchange is left out, since it is in the prompt verbatim.
+        """
+        with self.lock:
+            target = len(self.messages) - 2
+            if target <= self.summarized:
+                return None
+            return self.summary, self.messages[self.summarized:target], target
+
+    def update_summary(self, summary: str, summarized: int) -> None:
+        with self.lock:
+            self.summary = summary
+            self.summarized = summarized
+
+    def history_block(self, token_budget: int) -> str:
+        """Conversation block for the prompt: the summary, then the newest unsummarized messages within the budget.
+
+        That is normally just the latest exchange; older messages only show up
+        while the summary is catching up with them.
+        """
+        with self.lock:
+            summary, unsummarized = self.summary, self.messages[self.summarized:]
+        summary = truncate_to_tokens(summary, SUMMARY_MAX_TOKENS)
+        remaining = token_budget - estimate_tokens(summary)
+        recent = []
+        for message in reversed(unsummarized):
+            if remaining <= 0:
+                break
+            content = truncate_to_tokens(message['content'], min(MESSAGE_MAX_TOKENS, remaining))
+            remaining -= estimate_tokens(content)
+            recent.append(f"{message['role']}: {content}")
+
+        block = ""
+        if summary:
+            block += f"\nConversation so far: {summary}"
+        if recent:
+            block += "\nRecent conversation:\n" + "\n".join(reversed(recent))
+        return block
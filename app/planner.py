@@ -0,0 +1,136 @@
+import re
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Set
+
+from qdrant_client import models
+
+
+CREDITS = re.compile(r'\b(\d+(?:\.\d+)?)[\s-]*credits?\b', re.IGNORECASE)
+# Slot letters have to be capitalised so "slot is" isn't read as a slot named "is"
+SLOT = re.compile(r'\b[Ss]lot\s+([A-Z]{1,2}\d?)\b|\b([A-Z]{1,2}\d?)[\s-][Ss]lot\b')
+LEVEL = re.compile(r'\b([1-9])00[\s-]*level\b', re.IGNORECASE)
+# Honorifics are skipped; a second name word has to be capitalised, so
+# "by prof Kumar good" stops at "Kumar"
+INSTRUCTOR = re.compile(
+    r'\b(?:[Tt]aught by\s+(?:(?:[Pp]rof(?:essor)?|[Dd]r)\.?\s+)?|by\s+(?:[Pp]rof(?:essor)?|[Dd]r)\.?\s+)'
+    r'([A-Za-z][A-Za-z.]*(?:\s+[A-Z][a-z.]*\b)?)'
+)
+# A prefix written before "courses", or a capitalised prefix that isn't part of a course code
+DEPARTMENT = re.compile(r'\b([A-Za-z]{2,3})(?=\s+courses?\b)|\b([A-Z]{3})\b(?![\s-]?\d)')
+# Explicit requests for a list of courses ("list", "show me all", "which 3-credit
+# COL courses", "what are the 400-level courses"); "which prof teaches the 3 credit
+# COL course" asks about one course and is searched instead
+LISTING = re.compile(
+    r'\b(?:list|show\s+(?:me\s+)?(?:all|every)'
+    r'|(?:which|all(?:\s+the)?|what\s+are(?:\s+all)?\s+the)\s+(?:[\w.]+[\s-]+){0,4}?courses)\b',
+    re.IGNORECASE
+)
+
+# Words the instructor pattern must not mistake for names
+NOT_NAMES = {'the', 'a', 'for', 'in', 'of', 'this', 'that', 'sem', 'semester', 'course', 'courses'}
+
+# Payload indexes the planner relies on, created by the course ingestion scripts
+COURSE_PAYLOAD_INDEXES = {
+    'department': models.PayloadSchemaType.KEYWORD,
+    'level': models.PayloadSchemaType.INTEGER,
+    'credits_value': models.PayloadSchemaType.FLOAT,
+    'slot': models.PayloadSchemaType.KEYWORD,
+    'instructor': models.PayloadSchemaType.TEXT,
+}
+
+
+@dataclass
+class CourseQueryPlan:
+    """Structured constraints pulled out of a course question."""
+    department: Optional[str] = None
+    level: Optional[int] = None
+    credits: Optional[float] = None
+    slot: Optional[str] = None
+    instructor: Optional[str] = None
+    listing: bool = False
+    conditions: List[models.FieldCondition] = field(default_factory=list)
+
+    def to_filter(self) -> models.Filter:
+        return models.Filter(must=self.conditions)
+
+    def describe(self) -> str:
+        parts = []
+        if self.department:
+            parts.append(f"department {self.department}")
+        if self.level:
+            parts.append(f"{self.level}00-level")
+        if self.credits is not None:
+            parts.append(f"{self.credits:g} credits")
+        if self.slot:
+            parts.append(f"slot {self.slot.upper()}")
+        if self.instructor:
+            parts.append(f"taught by {self.instructor}")
+        return ", ".join(parts)
+
+
+def find_department(query: str, departments: Optional[Set[str]] = None) -> Optional[str]:
+    """Department prefix mentioned in the query; without a known list, only "COL courses" style mentions count."""
+    for match in DEPARTMENT.finditer(query):
+        before_courses, capitalised = match.groups()
+        if departments is not None:
+            candidate = (before_courses or capitalised).upper()
+            if candidate in departments:
+                return candidate
+        elif before_courses and before_courses.isupper():
+            return before_courses
+    return None
+
+def plan_course_query(query: str, departments: Optional[Set[str]] = None) -> Optional[CourseQueryPlan]:
+    """Extract department, level, credit, slot and instructor constraints, if any.
+
+    Listing questions ("which 3-credit COL courses are in slot A") are marked so
+    they can be answered by a filtered scroll instead of a semantic search.
+    """
+    plan = CourseQueryPlan()
+
+    plan.department = find_department(query, departments)
+    if plan.department:
+        plan.conditions.append(models.FieldCondition(key='department', match=models.MatchValue(value=plan.department)))
+
+    level_match = LEVEL.search(query)
+    if level_match:
+        plan.level = int(level_match.group(1))
+        plan.conditions.append(models.FieldCondition(key='level', match=models.MatchValue(value=plan.level)))
+
+    credits_match = CREDITS.search(query)
+    if credits_match:
+        plan.credits = float(credits_match.group(1))
+        plan.conditions.append(models.FieldCondition(key='credits_value', range=models.Range(gte=plan.credits, lte=plan.credits)))
+
+    slot_match = SLOT.search(query)
+    if slot_match:
+        # Slots are stored lowercased by the ingestion scripts
+        plan.slot = (slot_match.group(1) or slot_match.group(2)).lower()
+        plan.conditions.append(models.FieldCondition(key='slot', match=models.MatchValue(value=plan.slot)))
+
+    instructor_match = INSTRUCTOR.search(query)
+    if instructor_match:
+        words = [word for word in instructor_match.group(1).split() if word.lower() not in NOT_NAMES]
+        if words:
+            plan.instructor = " ".join(words).lower()
+            plan.conditions.append(models.FieldCondition(key='instructor', match=models.MatchText(text=plan.instructor)))
+
+    if not plan.conditions:
+        return None
+    plan.listing = bool(LISTING.search(query))
+    return plan
+
+
+def course_payload_fields(course_code: str, credits) -> Dict:
+    """Derived payload fields the planner filters on: department, level and numeric credits."""
+    department = re.match(r'[A-Z]+', course_code or "")
+    level = re.search(r'\d', course_code or "")
+    try:
+        credits_value = float(credits)
+    except (TypeError, ValueError):
+        credits_value = None
+    return {
+        'department': department.group(0) if department else None,
+        'level': int(level.group(0)) if level else None,
+        'credits_value': credits_value,
+    }
@@ -0,0 +1,53 @@
+from typing import Optional
+
+from qdrant_client import models
+
+# Storage modes for the dense vectors. Quantized vectors stay in RAM for the
+# HNSW search; the fp32 originals can move to disk and are only read to rescore
+QUANTIZATION_MODES = ['none', 'int8', 'binary']
+
+# Candidates fetched per requested hit before rescoring with the originals.
+# Binary codes (1 bit per dimension) need more than int8 to keep recall on 384-dim vectors
+OVERSAMPLING = {
+    'int8': 2.0,
+    'binary': 3.0,
+}
+
+# int8 ranges are set from this quantile of the values, so outliers don't squash the rest
+INT8_QUANTILE = 0.99
+
+
+def check_mode(mode: str) -> str:
+    if mode not in QUANTIZATION_MODES:
+        raise ValueError(f"Unknown quantization mode {mode!r}, expected one of {', '.join(QUANTIZATION_MODES)}")
+    return mode
+
+def quantization_config(mode: str) -> Optional[models.QuantizationConfig]:
+    """Collection quantization config for a mode, or None for plain fp32."""
+    check_mode(mode)
+    if mode == 'int8':
+        return models.ScalarQuantization(
+            scalar=models.ScalarQuantizationConfig(type=models.ScalarType.INT8, quantile=INT8_QUANTILE, always_ram=True)
+        )
+    if mode == 'binary':
+        return models.BinaryQuantization(binary=models.BinaryQuantizationConfig(always_ram=True))
+    return None
+
+def quantization_mode(config) -> str:
+    """The mode a collection's current quantization config corresponds to."""
+    if isinstance(config, models.ScalarQuantization):
+        return 'int8'
+    if isinstance(config, models.BinaryQuantization):
+        return 'binary'
+    return 'none'
+
+def search_params(mode: str, oversampling: Optional[float] = None) -> Optional[models.SearchParams]:
+    """Dense search params for collections quantized with mode: oversample, then rescore with the originals."""
+    if check_mode(mode) == 'none':
+        return None
+    return models.SearchParams(
+        quantization=models.QuantizationSearchParams(
+            rescore=True,
+            oversampling=oversampling or OVERSAMPLING[mode],
+        )
+    )
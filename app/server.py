@@ -0,0 +1,158 @@
+import os
+import json
+import uuid
+import asyncio
+import argparse
+from typing import Optional
+
+import tornado.web
+from tornado.iostream import StreamClosedError
+
+from caching import MISSING, TTLCache
+from core import Navigator
+from memory import Conversation
+import telemetry
+
+# Conversations are kept in memory and dropped after a day without messages
+SESSION_TTL = 24 * 60 * 60
+MAX_SESSIONS = 10000
+
+
+class SessionStore:
+    """Conversation per session ID, expiring idle sessions."""
+
+    def __init__(self, max_size: int = MAX_SESSIONS, ttl: float = SESSION_TTL):
+        self.sessions = TTLCache(max_size=max_size, ttl=ttl)
+
+    def create(self) -> str:
+        session_id = uuid.uuid4().hex
+        self.sessions.set(session_id, Conversation())
+        return session_id
+
+    def get(self, session_id: str) -> Optional[Conversation]:
+        conversation = self.sessions.get(session_id)
+        if conversation is MISSING:
+            return None
+        # Setting it again refreshes the TTL
+        self.sessions.set(session_id, conversation)
+        return conversation
+
+    def delete(self, session_id: str) -> None:
+        self.sessions.delete(session_id)
+
+
+class BaseHandler(tornado.web.RequestHandler):
+    def initialize(self, navigator: Navigator, sessions: SessionStore):
+        self.navigator = navigator
+        self.sessions = sessions
+
+    def write_json(self, data, status: int = 200):
+        self.set_status(status)
+        self.set_header("Content-Type", "application/json")
+        self.finish(json.dumps(data))
+
+    def session_or_404(self, session_id: str) -> Conversation:
+        conversation = self.sessions.get(session_id)
+        if conversation is None:
+            raise tornado.web.HTTPError(404, reason="Unknown session")
+        return conversation
+
+
+class SessionsHandler(BaseHandler):
+    def post(self):
+        """Start a conversation."""
+        self.write_json({"session_id": self.sessions.create()}, status=201)
+
+
+class SessionHandler(BaseHandler):
+    def get(self, session_id: str):
+        """The conversation so far, with its rolling summary."""
+        conversation = self.session_or_404(session_id)
+        self.write_json({"session_id": session_id, "messages": conversation.transcript(),
+                         "summary": conversation.summary})
+
+    def delete(self, session_id: str):
+        self.session_or_404(session_id)
+        self.sessions.delete(session_id)
+        self.set_status(204)
+
+
+class MessagesHandler(BaseHandler):
+    async def post(self, session_id: str):
+        """Answer a message, streaming the reply as chunked plain text.
+
+        The body is {"message": "..."}; the trace ID of the answer is returned
+        in the X-Trace-Id header.
+        """
+        conversation = self.session_or_404(session_id)
+        try:
+            query = json.loads(self.request.body or b"{}").get("message", "").strip()
+        except (ValueError, AttributeError):
+            raise tornado.web.HTTPError(400, reason="Body must be JSON with a 'message'")
+        if not query:
+            raise tornado.web.HTTPError(400, reason="Empty message")
+
+        trace = telemetry.Trace(query)
+        self.set_header("Content-Type", "text/plain; charset=utf-8")
+        self.set_header("Cache-Control", "no-cache")
+        self.set_header("X-Trace-Id", trace.id)
+
+        # The navigator adds the exchange to the conversation once it is answered.
+        # Messages sent to a session before the previous answer finished wait for
+        # it, so each one sees the exchanges before it
+        async with conversation.turn_lock:
+            stream = self.navigator.chat(query, conversation, trace)
+            try:
+                async for chunk in stream:
+                    self.write(chunk)
+                    await self.flush()
+            except StreamClosedError:
+                # The client went away; stop generating
+                await stream.aclose()
+                return
+        self.finish()
+
+
+class MetricsHandler(BaseHandler):
+    def get(self):
+        """Process-wide metrics in Prometheus text format."""
+        self.set_header("Content-Type", "text/plain; version=0.0.4")
+        self.finish(telemetry.metrics.to_prometheus())
+
+
+class HealthHandler(BaseHandler):
+    def get(self):
+        self.write_json({"status": "ok"})
+
+
+def make_app(navigator: Navigator, sessions: Optional[SessionStore] = None) -> tornado.web.Application:
+    """HTTP API around a Navigator."""
+    handler_args = {"navigator": navigator, "sessions": sessions or SessionStore()}
+    return tornado.web.Application([
+        (r"/sessions", SessionsHandler, handler_args),
+        (r"/sessions/([0-9a-f]+)", SessionHandler, handler_args),
+        (r"/sessions/([0-9a-f]+)/messages", MessagesHandler, handler_args),
+        (r"/metrics", MetricsHandler, handler_args),
+        (r"/health", HealthHandler, handler_args),
+    ])
+
+async def serve(navigator: Navigator, host: str, port: int):
+    make_app(navigator).listen(port, address=host)
+    print(f"Serving on http://{host}:{port}")
+    await asyncio.Event().wait()
+
+def main():
+    parser = argparse.ArgumentParser(description="Headless HTTP API for the campus navigator.")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8000)
+    args = parser.parse_args()
+
+    navigator = Navigator.from_settings(
+        groq_api_key=os.environ["GROQ_API_KEY"],
+        qdrant_url=os.environ["QDRANT_ENDPOINT"],
+        qdrant_api_key=os.environ["QDRANT_API_KEY"],
+    )
+    asyncio.run(serve(navigator, args.host, args.port))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,193 @@
+import os
+import json
+import time
+import uuid
+import tempfile
+import threading
+import contextvars
+from contextlib import contextmanager
+from collections import defaultdict
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+# Trace of the request being handled
+_current_trace = contextvars.ContextVar('current_trace', default=None)
+
+
+def _label_key(labels: Dict[str, Any]) -> Tuple:
+    return tuple(sorted((key, str(value)) for key, value in labels.items()))
+
+def _format_labels(key: Tuple) -> str:
+    if not key:
+        return ""
+    return "{" + ",".join(f'{name}="{value}"' for name, value in key) + "}"
+
+
+class Metrics:
+    """Process-wide counters and stage timings, exportable as Prometheus text."""
+
+    def __init__(self, prefix: str = "navigator"):
+        self.prefix = prefix
+        self.lock = threading.Lock()
+        self.counters = defaultdict(float)
+        self.timings = defaultdict(lambda: [0, 0.0])
+        self.gauges: Dict[str, Callable[[], float]] = {}
+
+    def increment(self, name: str, value: float = 1.0, **labels) -> None:
+        with self.lock:
+            self.counters[(name, _label_key(labels))] += value
+
+    def observe(self, name: str, seconds: float, **labels) -> None:
+        with self.lock:
+            timing = self.timings[(name, _label_key(labels))]
+            timing[0] += 1
+            timing[1] += seconds
+
+    def gauge(self, name: str, read: Callable[[], float]) -> None:
+        """Report read() under name at export time, e.g. a cache's hit count."""
+        self.gauges[name] = read
+
+    def to_prometheus(self) -> str:
+        lines = []
+        typed = set()
+        def sample(family: str, kind: str, line: str) -> None:
+            if family not in typed:
+                typed.add(family)
+                lines.append(f"# TYPE {family} {kind}")
+            lines.append(line)
+
+        with self.lock:
+            counters = sorted(self.counters.items())
+            timings = sorted(self.timings.items())
+        for (name, labels), value in counters:
+            family = f"{self.prefix}_{name}_total"
+            sample(family, "counter", f"{family}{_format_labels(labels)} {value}")
+        for (name, labels), (count, total) in timings:
+            # A summary without quantiles: just the count and sum of observations
+            family = f"{self.prefix}_{name}_seconds"
+            sample(family, "summary", f"{family}_count{_format_labels(labels)} {count}")
+            lines.append(f"{family}_sum{_format_labels(labels)} {total:.6f}")
+        for name, read in sorted(self.gauges.items()):
+            try:
+                value = float(read())
+            except Exception as e:
+                print(f"Error reading metric {name}: {e}")
+                continue
+            family = f"{self.prefix}_{name}"
+            sample(family, "gauge", f"{family} {value}")
+        return "\n".join(lines) + "\n"
+
+    def write_prometheus(self, path: str) -> None:
+        """Write the metrics as a Prometheus textfile, replacing the old one atomically.
+
+        Each write goes through its own temporary file in the same directory, so
+        concurrent writers never interleave; the .tmp suffix keeps the textfile
+        collector from reading it half-written.
+        """
+        directory, name = os.path.split(os.path.abspath(path))
+        with tempfile.NamedTemporaryFile('w', dir=directory, prefix=name + ".", suffix=".tmp", delete=False) as file:
+            try:
+                file.write(self.to_prometheus())
+            except BaseException:
+                file.close()
+                os.unlink(file.name)
+                raise
+        # Temporary files are created owner-only; the collector may run as another user
+        os.chmod(file.name, 0o644)
+        os.replace(file.name, path)
+
+
+metrics = Metrics()
+
+
+class Trace:
+    """Timing spans, token counts and errors of one chat request."""
+
+    def __init__(self, query: str):
+        self.id = uuid.uuid4().hex[:12]
+        self.query = query
+        self.started = time.time()
+        self.finished: Optional[float] = None
+        self.spans: List[Dict[str, Any]] = []
+        self.counts: Dict[str, float] = {}
+        self.errors: List[Dict[str, str]] = []
+        self.lock = threading.Lock()
+
+    def add_span(self, name: str, start: float, seconds: float, **attributes) -> None:
+        with self.lock:
+            self.spans.append({'name': name, 'start_ms': round((start - self.started) * 1000, 1),
+                               'ms': round(seconds * 1000, 1), **attributes})
+
+    def count(self, name: str, value: float = 1) -> None:
+        with self.lock:
+            self.counts[name] = self.counts.get(name, 0) + value
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            'trace_id': self.id,
+            'time': self.started,
+            'query': self.query,
+            'total_ms': round(((self.finished or time.time()) - self.started) * 1000, 1),
+            'spans': sorted(self.spans, key=lambda span: span['start_ms']),
+            'counts': self.counts,
+            'errors': self.errors,
+        }
+
+
+def start_trace(query: str, trace: Optional[Trace] = None) -> Trace:
+    """Start tracing a request in the current context, into a new trace or one the caller holds."""
+    trace = trace or Trace(query)
+    _current_trace.set(trace)
+    return trace
+
+def current_trace() -> Optional[Trace]:
+    return _current_trace.get()
+
+@contextmanager
+def span(name: str, **attributes):
+    """Time a block as a stage of the current request and in the process-wide metrics."""
+    start = time.time()
+    try:
+        yield
+    finally:
+        seconds = time.time() - start
+        metrics.observe('stage', seconds, stage=name, **attributes)
+        trace = current_trace()
+        if trace is not None:
+            trace.add_span(name, start, seconds, **attributes)
+
+def count(name: str, value: float = 1) -> None:
+    """Add to a counter of the current request and the process-wide one."""
+    metrics.increment(name, value)
+    trace = current_trace()
+    if trace is not None:
+        trace.count(name, value)
+
+def note(name: str, value: Any) -> None:
+    """Attach a value to the current request only, e.g. its time to first token."""
+    trace = current_trace()
+    if trace is not None:
+        with trace.lock:
+            trace.counts[name] = value
+
+def record_error(stage: str, error: Exception, **labels) -> None:
+    """Count an error by stage (and e.g. collection) and attach it to the current request."""
+    metrics.increment('errors', stage=stage, **labels)
+    trace = current_trace()
+    if trace is not None:
+        with trace.lock:
+            trace.errors.append({'stage': stage, 'error': f"{type(error).__name__}: {error}",
+                                 **{key: str(value) for key, value in labels.items()}})
+
+def finish_trace(trace: Trace, log_path: Optional[str] = None, metrics_path: Optional[str] = None) -> None:
+    """Append the trace to a JSON lines log and refresh the Prometheus textfile, where configured."""
+    trace.finished = time.time()
+    metrics.increment('requests')
+    metrics.observe('request', trace.finished - trace.started)
+    try:
+        if log_path:
+            with open(log_path, 'a') as file:
+                file.write(json.dumps(trace.to_dict(), default=str) + "\n")
+        if metrics_path:
+            metrics.write_prometheus(metrics_path)
+    except Exception as e:
+        print(f"Error exporting metrics: {e}")
@@ -0,0 +1,66 @@
+import os
+import io
+import sys
+import time
+import shutil
+import argparse
+import tempfile
+import subprocess
+from contextlib import redirect_stdout
+
+import scrape_cos_sps
+from parse_catalog import parse_catalog
+from course_pipeline import parse_courses
+
+SCRIPTS_DIR = os.path.dirname(os.path.abspath(__file__))
+
+def time_sps(pdf_path):
+    """The current PDF scraper, end to end minus writing the JSON."""
+    start = time.perf_counter()
+    with redirect_stdout(io.StringIO()):
+        text = scrape_cos_sps.read_pdf(pdf_path)
+        text = scrape_cos_sps.remove_page_numbers(text)
+        text = scrape_cos_sps.normalize_overlaps(text)
+        catalog = scrape_cos_sps.parse_course_catalog(text)
+    return time.perf_counter() - start, set(catalog)
+
+def time_parse_catalog(pdf_path, workers):
+    start = time.perf_counter()
+    codes = {record['course_code'] for record in parse_catalog(pdf_path, workers)}
+    return time.perf_counter() - start, codes
+
+def time_apj(text_path):
+    """scrape_cos_apj.py is a top-level script, so run it in a scratch directory."""
+    with tempfile.TemporaryDirectory() as scratch:
+        shutil.copy(text_path, os.path.join(scratch, 'CoursesofStudy.txt'))
+        start = time.perf_counter()
+        subprocess.run([sys.executable, os.path.join(SCRIPTS_DIR, 'scrape_cos_apj.py')], cwd=scratch, check=True)
+        return time.perf_counter() - start
+
+def time_parse_courses(text_path):
+    start = time.perf_counter()
+    count = sum(1 for _ in parse_courses(text_path))
+    return time.perf_counter() - start, count
+
+def main():
+    parser = argparse.ArgumentParser(description="Time the catalog parsers against the current scraping scripts.")
+    parser.add_argument('pdf', nargs='?', default='Courses of Study 2023-24.pdf')
+    parser.add_argument('--text', help="CoursesofStudy.txt, to also compare the text parsers")
+    parser.add_argument('--workers', type=int, nargs='+', default=[1, os.cpu_count()])
+    args = parser.parse_args()
+
+    sps_time, sps_codes = time_sps(args.pdf)
+    print(f"scrape_cos_sps.py               {sps_time:>8.2f}s  {len(sps_codes)} courses")
+    for workers in args.workers:
+        parse_time, codes = time_parse_catalog(args.pdf, workers)
+        print(f"parse_catalog.py ({workers:>2} workers)   {parse_time:>8.2f}s  {len(codes)} courses, "
+              f"{len(codes & sps_codes)} shared with scrape_cos_sps.py, {sps_time / parse_time:.1f}x faster")
+
+    if args.text:
+        apj_time = time_apj(args.text)
+        stream_time, count = time_parse_courses(args.text)
+        print(f"scrape_cos_apj.py               {apj_time:>8.2f}s  (includes interpreter start-up)")
+        print(f"course_pipeline.parse_courses   {stream_time:>8.2f}s  {count} course blocks")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,103 @@
+import os
+import sys
+import json
+import time
+import argparse
+import resource
+import subprocess
+import tempfile
+import numpy as np
+
+APP_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'app')
+
+QUERIES = [
+    "how is COL106",
+    "best hostel mess",
+    "how to prep for quant interviews",
+    "which prof is taking MTL100 this semester",
+    "what are the prerequisites for COL331",
+    "is APL100 a fakka course",
+    "where do people hang out at night on campus",
+    "how to talk to my crush at rdv",
+    "what companies come for software placements",
+    "study material for electromagnetics",
+    "how does hostel allotment work for freshers",
+    "which clubs should I join in first year",
+    "how to get a research intern abroad",
+    "is it possible to get a dassi in ELL101",
+    "what is the scene at SAC on weekends",
+    "how do I balance acads and extracurriculars",
+]
+
+def percentile(values, p):
+    return float(np.percentile(values, p)) * 1000
+
+def run_worker(backend, out_dir, repeats):
+    """Measure one backend in this process so RSS isn't shared with the other."""
+    sys.path.insert(0, APP_DIR)
+    from encoders import load_encoder
+
+    start = time.perf_counter()
+    encoder = load_encoder(backend, cache_size=0)
+    encoder.encode(QUERIES[0])
+    load_time = time.perf_counter() - start
+
+    latencies = []
+    for _ in range(repeats):
+        for query in QUERIES:
+            start = time.perf_counter()
+            encoder.encode(query)
+            latencies.append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    vectors = np.asarray(encoder.encode(QUERIES), dtype=np.float32)
+    batch_time = time.perf_counter() - start
+
+    np.save(os.path.join(out_dir, f"{backend}.npy"), vectors)
+    with open(os.path.join(out_dir, f"{backend}.json"), 'w') as file:
+        json.dump({
+            'load_s': load_time,
+            'p50_ms': percentile(latencies, 50),
+            'p95_ms': percentile(latencies, 95),
+            'batch_per_query_ms': batch_time / len(QUERIES) * 1000,
+            # ru_maxrss is reported in kilobytes on Linux
+            'peak_rss_mb': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+        }, file)
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare query encoder backends: latency, memory and cosine drift.")
+    parser.add_argument('--backends', nargs='+', default=['torch', 'onnx'])
+    parser.add_argument('--repeats', type=int, default=20)
+    parser.add_argument('--worker', help=argparse.SUPPRESS)
+    parser.add_argument('--out', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        run_worker(args.worker, args.out, args.repeats)
+        return
+
+    with tempfile.TemporaryDirectory() as out_dir:
+        for backend in args.backends:
+            print(f"Benchmarking {backend}...")
+            subprocess.run(
+                [sys.executable, __file__, '--worker', backend, '--out', out_dir, '--repeats', str(args.repeats)],
+                check=True
+            )
+
+        reference = np.load(os.path.join(out_dir, f"{args.backends[0]}.npy"))
+        print()
+        print(f"{'backend':<8} {'load s':>7} {'p50 ms':>7} {'p95 ms':>7} {'batch ms/q':>10} {'RSS MB':>7} {'mean cos':>9} {'min cos':>8}")
+        for backend in args.backends:
+            with open(os.path.join(out_dir, f"{backend}.json")) as file:
+                stats = json.load(file)
+            vectors = np.load(os.path.join(out_dir, f"{backend}.npy"))
+            cosines = np.sum(reference * vectors, axis=1) / (
+                np.linalg.norm(reference, axis=1) * np.linalg.norm(vectors, axis=1)
+            )
+            print(f"{backend:<8} {stats['load_s']:>7.2f} {stats['p50_ms']:>7.2f} {stats['p95_ms']:>7.2f} "
+                  f"{stats['batch_per_query_ms']:>10.2f} {stats['peak_rss_mb']:>7.0f} "
+                  f"{cosines.mean():>9.4f} {cosines.min():>8.4f}")
+        print(f"\nCosine similarity is measured against {args.backends[0]}.")
+
+if __name__ == "__main__":
+    main()
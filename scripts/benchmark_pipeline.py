@@ -0,0 +1,228 @@
+import os
+import sys
+import json
+import time
+import asyncio
+import argparse
+from collections import defaultdict
+from types import SimpleNamespace
+import numpy as np
+
+APP_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'app')
+sys.path.insert(0, APP_DIR)
+import core
+import telemetry
+from core import Navigator
+from intent import COLLECTIONS
+from catalog import CourseCatalog
+from encoders import load_encoder
+
+# Fixed corpus so runs are comparable across changes
+QUERIES = [
+    "how is COL106",
+    "best hostel mess",
+    "how to prep for quant interviews",
+    "which prof is taking MTL100 this semester",
+    "what are the prerequisites for COL331",
+    "is APL100 a fakka course",
+    "where do people hang out at night on campus",
+    "how to talk to my crush at rdv",
+    "what companies come for software placements",
+    "study material for electromagnetics",
+    "how does hostel allotment work for freshers",
+    "which clubs should I join in first year",
+    "how to get a research intern abroad",
+    "is it possible to get a dassi in ELL101",
+    "which 3-credit COL courses are in slot A",
+    "compare COL106 and COL202 workload",
+    "what is the scene at SAC on weekends",
+    "how do I balance acads and extracurriculars",
+]
+
+# Spans recorded by the pipeline's tracing (see app/telemetry.py), reported in order
+STAGES = [
+    'resolve_codes',
+    'encode',
+    'response_cache',
+    'route',
+    'intent_llm',
+    'retrieve',
+    'search',
+    'filtered_scroll',
+    'course_retrieve',
+    'build_context',
+    'completion',
+]
+
+
+class StubGroq:
+    """Local stand-in for the async Groq client.
+
+    Non-streaming calls (intent analysis) sleep for `latency` and return flat
+    scores; streaming calls wait `latency` for the first token, then emit
+    `tokens` chunks `token_latency` apart.
+    """
+
+    def __init__(self, latency=0.3, token_latency=0.01, tokens=200):
+        self.latency = latency
+        self.token_latency = token_latency
+        self.tokens = tokens
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self.create))
+
+    async def create(self, model=None, messages=None, stream=False, response_format=None, **kwargs):
+        if stream:
+            return self.stream()
+        await asyncio.sleep(self.latency)
+        if response_format:
+            content = json.dumps({"courses": 0.5, "interviews": 0.5, "inception": 0.5, "united": 0.5})
+        else:
+            content = "stub " * self.tokens
+        return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content=content))])
+
+    async def stream(self):
+        await asyncio.sleep(self.latency)
+        for index in range(self.tokens):
+            if index:
+                await asyncio.sleep(self.token_latency)
+            yield SimpleNamespace(choices=[SimpleNamespace(delta=SimpleNamespace(content="stub "))])
+
+
+def copy_snapshot(path, remote_url, remote_api_key):
+    """Copy the four collections from a remote server into a local Qdrant directory."""
+    from qdrant_client import QdrantClient
+
+    local = QdrantClient(path=path)
+    remote = QdrantClient(url=remote_url, api_key=remote_api_key)
+    start = time.perf_counter()
+    remote.migrate(local, collection_names=list(COLLECTIONS), recreate_on_collision=True)
+    print(f"Copied {', '.join(COLLECTIONS)} to {path} in {time.perf_counter() - start:.1f}s")
+    # Local mode locks the directory, so release it for the async client
+    local.close()
+
+async def open_snapshot(path):
+    """Open the local Qdrant directory with the async client the pipeline uses."""
+    from qdrant_client import AsyncQdrantClient
+
+    local = AsyncQdrantClient(path=path)
+    missing = [name for name in COLLECTIONS if not await local.collection_exists(name)]
+    if missing:
+        raise SystemExit(f"Snapshot {path} is missing {', '.join(missing)}; rerun with --from-remote")
+    return local
+
+async def load_catalog(client):
+    """Course catalog scrolled out of the local courses collection."""
+    courses, offset = {}, None
+    while True:
+        points, offset = await client.scroll(
+            collection_name='courses', limit=1000, offset=offset, with_payload=['course_code', 'course_name']
+        )
+        for point in points:
+            if point.payload and point.payload.get('course_code'):
+                courses[point.payload['course_code']] = point.payload.get('course_name', '')
+        if offset is None:
+            return CourseCatalog(courses)
+
+def reset_caches(navigator):
+    """Start a query cold: no cached answers, courses or query embeddings."""
+    navigator.response_cache.clear()
+    navigator.course_cache.clear()
+    if hasattr(navigator.encoder, 'cache'):
+        navigator.encoder.cache.clear()
+
+async def run_query(navigator, query):
+    """Run one query through the pipeline, consume the stream, and return its stage timings in seconds."""
+    trace = telemetry.Trace(query)
+    start = time.perf_counter()
+    first_token = None
+    async for _ in navigator.chat(query, None, trace):
+        if first_token is None:
+            first_token = time.perf_counter() - start
+    timings = defaultdict(float)
+    for span in trace.spans:
+        timings[span['name']] += span['ms'] / 1000
+        if 'collection' in span:
+            timings[f"{span['name']}[{span['collection']}]"] += span['ms'] / 1000
+    timings['first_token'] = first_token or 0.0
+    timings['total'] = time.perf_counter() - start
+    return timings
+
+def percentile(values, p):
+    return float(np.percentile(values, p)) * 1000
+
+async def benchmark(args, queries):
+    client = await open_snapshot(args.snapshot)
+    navigator = Navigator(
+        groq=StubGroq(args.llm_latency, args.token_latency, args.tokens),
+        client=client,
+        encoder=load_encoder(core.ENCODER_BACKEND, cache_size=core.EMBEDDING_CACHE_SIZE),
+        course_catalog=await load_catalog(client),
+    )
+    core.SPECULATIVE_RETRIEVAL = not args.sequential
+
+    # One untimed pass loads the encoder and warms the local collections
+    await run_query(navigator, queries[0])
+
+    samples = defaultdict(list)
+    runs = [query for _ in range(args.repeats) for query in queries]
+    for batch_start in range(0, len(runs), args.concurrency):
+        if not args.warm:
+            reset_caches(navigator)
+        batch = runs[batch_start:batch_start + args.concurrency]
+        for timings in await asyncio.gather(*[run_query(navigator, query) for query in batch]):
+            for stage, seconds in timings.items():
+                samples[stage].append(seconds)
+    return samples
+
+def main():
+    parser = argparse.ArgumentParser(description="Offline latency benchmark of the chat pipeline, per stage.")
+    parser.add_argument('--snapshot', default='bench_qdrant', help="Local Qdrant directory with the four collections")
+    parser.add_argument('--from-remote', action='store_true',
+                        help="Refresh the snapshot from QDRANT_ENDPOINT / QDRANT_API_KEY first")
+    parser.add_argument('--queries', help="File with one query per line, instead of the built-in corpus")
+    parser.add_argument('--repeats', type=int, default=5)
+    parser.add_argument('--concurrency', type=int, default=1, help="Conversations in flight at once")
+    parser.add_argument('--warm', action='store_true', help="Keep caches between queries")
+    parser.add_argument('--sequential', action='store_true', help="Disable speculative retrieval")
+    parser.add_argument('--llm-latency', type=float, default=0.3, help="Stub time to first token, in seconds")
+    parser.add_argument('--token-latency', type=float, default=0.01, help="Stub time between tokens, in seconds")
+    parser.add_argument('--tokens', type=int, default=200, help="Stub tokens per answer")
+    parser.add_argument('--output', help="Write the per-stage percentiles as JSON")
+    args = parser.parse_args()
+
+    queries = QUERIES
+    if args.queries:
+        with open(args.queries, 'r') as file:
+            queries = [line.strip() for line in file if line.strip()]
+
+    if args.from_remote:
+        copy_snapshot(args.snapshot, os.getenv('QDRANT_ENDPOINT'), os.getenv('QDRANT_API_KEY'))
+
+    samples = asyncio.run(benchmark(args, queries))
+
+    runs = args.repeats * len(queries)
+    per_collection = sorted(stage for stage in samples if '[' in stage)
+    stages = [stage for stage in STAGES + per_collection + ['first_token', 'total'] if samples.get(stage)]
+    report = {
+        stage: {
+            'calls': len(samples[stage]),
+            'p50_ms': percentile(samples[stage], 50),
+            'p95_ms': percentile(samples[stage], 95),
+            'p99_ms': percentile(samples[stage], 99),
+        }
+        for stage in stages
+    }
+
+    mode = "sequential" if args.sequential else "speculative"
+    print(f"{runs} runs, {mode} retrieval, {'warm' if args.warm else 'cold'} caches, concurrency {args.concurrency}")
+    print("Stages that run concurrently overlap, so they don't add up to 'total'")
+    print(f"{'stage':<28} {'runs':>6} {'p50 ms':>10} {'p95 ms':>10} {'p99 ms':>10}")
+    for stage, stats in report.items():
+        print(f"{stage:<28} {stats['calls']:>6} {stats['p50_ms']:>10.1f} {stats['p95_ms']:>10.1f} {stats['p99_ms']:>10.1f}")
+
+    if args.output:
+        with open(args.output, 'w') as file:
+            json.dump({'mode': mode, 'warm': args.warm, 'concurrency': args.concurrency, 'runs': runs,
+                       'stages': report}, file, indent=2)
+
+if __name__ == "__main__":
+    main()
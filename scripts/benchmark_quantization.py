@@ -0,0 +1,150 @@
+import os
+import sys
+import json
+import time
+import random
+import argparse
+import numpy as np
+from qdrant_client import QdrantClient, models
+
+APP_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'app')
+sys.path.insert(0, APP_DIR)
+from intent import COLLECTIONS
+from encoders import load_encoder
+from quantization import OVERSAMPLING, QUANTIZATION_MODES, quantization_config, search_params
+from benchmark_pipeline import QUERIES
+
+# Bytes per dimension of the vectors searched in RAM
+BYTES_PER_DIMENSION = {'none': 4, 'int8': 1, 'binary': 1 / 8}
+
+
+def read_vectors(client, collection):
+    """Every point's dense vector from the source collection."""
+    ids, vectors, offset = [], [], None
+    while True:
+        points, offset = client.scroll(collection_name=collection, limit=1000, offset=offset,
+                                       with_payload=False, with_vectors=True)
+        for point in points:
+            # Collections with a sparse vector return named vectors; the dense one is unnamed
+            vector = point.vector.get("") if isinstance(point.vector, dict) else point.vector
+            if vector:
+                ids.append(point.id)
+                vectors.append(vector)
+        if offset is None:
+            return ids, np.array(vectors, dtype=np.float32)
+
+def build_copy(client, name, ids, vectors, mode, on_disk):
+    """A scratch collection with the given storage, indexed and ready to search."""
+    if client.collection_exists(name):
+        client.delete_collection(name)
+    client.create_collection(
+        collection_name=name,
+        vectors_config=models.VectorParams(size=vectors.shape[1], distance=models.Distance.COSINE, on_disk=on_disk),
+        quantization_config=quantization_config(mode),
+    )
+    client.upload_collection(collection_name=name, vectors=vectors, ids=ids, batch_size=256, wait=True)
+    # Quantized vectors and the HNSW graph are built by the optimizer after the upload
+    while client.get_collection(name).status != models.CollectionStatus.GREEN:
+        time.sleep(0.5)
+
+def make_queries(encoder, ids, vectors, sample):
+    """The pipeline's query corpus, plus stored vectors searched for with the point itself excluded."""
+    queries = [(vector.tolist(), None) for vector in encoder.encode(QUERIES)]
+    for index in random.sample(range(len(ids)), min(sample, len(ids))):
+        exclude = models.Filter(must_not=[models.HasIdCondition(has_id=[ids[index]])])
+        queries.append((vectors[index].tolist(), exclude))
+    return queries
+
+def search(client, name, queries, k, params):
+    """Top-k IDs and latency in seconds for every query."""
+    results, latencies = [], []
+    for vector, query_filter in queries:
+        start = time.perf_counter()
+        response = client.query_points(collection_name=name, query=vector, query_filter=query_filter,
+                                       search_params=params, limit=k)
+        latencies.append(time.perf_counter() - start)
+        results.append([point.id for point in response.points])
+    return results, latencies
+
+def recall_at_k(results, truth, k):
+    return float(np.mean([len(set(found[:k]) & set(exact[:k])) / max(1, min(k, len(exact)))
+                          for found, exact in zip(results, truth)]))
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Recall@k and latency of quantized copies of the collections against the current fp32 setup. "
+                    "Needs a Qdrant server; local mode ignores quantization.")
+    parser.add_argument('--url', default='http://localhost:6333', help="Qdrant server to build the copies on")
+    parser.add_argument('--api-key')
+    parser.add_argument('--source-url', default=os.getenv('QDRANT_ENDPOINT'), help="Where the collections live")
+    parser.add_argument('--source-api-key', default=os.getenv('QDRANT_API_KEY'))
+    parser.add_argument('--collections', nargs='+', default=COLLECTIONS)
+    parser.add_argument('--modes', nargs='+', choices=QUANTIZATION_MODES, default=QUANTIZATION_MODES)
+    parser.add_argument('--on-disk', action='store_true', help="Keep the originals on disk in the quantized copies")
+    parser.add_argument('--oversampling', type=float, help="Override the per-mode oversampling factor")
+    parser.add_argument('--sample', type=int, default=200, help="Stored vectors to use as extra queries")
+    parser.add_argument('--repeats', type=int, default=3, help="Timed passes over the queries")
+    parser.add_argument('-k', type=int, default=5)
+    parser.add_argument('--keep', action='store_true', help="Leave the copies on the server")
+    parser.add_argument('--output', help="Write the results as JSON")
+    args = parser.parse_args()
+
+    random.seed(0)
+    source = QdrantClient(url=args.source_url, api_key=args.source_api_key)
+    client = QdrantClient(url=args.url, api_key=args.api_key)
+    encoder = load_encoder('torch')
+    modes = ['none'] + [mode for mode in args.modes if mode != 'none']
+
+    report = []
+    print(f"{'collection':<12} {'config':<16} {'recall@' + str(args.k):>9} {'p50 ms':>8} {'p95 ms':>8} {'RAM MB':>8}")
+    for collection in args.collections:
+        ids, vectors = read_vectors(source, collection)
+        if not ids:
+            print(f"{collection}: no vectors, skipped")
+            continue
+        queries = make_queries(encoder, ids, vectors, args.sample)
+        truth = None
+        for mode in modes:
+            name = f"{collection}_bench_{mode}"
+            # The fp32 baseline mirrors the current collections: originals in RAM
+            on_disk = args.on_disk and mode != 'none'
+            build_copy(client, name, ids, vectors, mode, on_disk)
+            if truth is None:
+                truth, _ = search(client, name, queries, args.k, models.SearchParams(exact=True))
+
+            params = search_params(mode, args.oversampling)
+            search(client, name, queries, args.k, params)
+            latencies = []
+            for _ in range(args.repeats):
+                results, pass_latencies = search(client, name, queries, args.k, params)
+                latencies.extend(pass_latencies)
+
+            config = mode if mode == 'none' else f"{mode} x{args.oversampling or OVERSAMPLING[mode]:g}"
+            if on_disk:
+                config += " disk"
+            ram = len(ids) * vectors.shape[1] * BYTES_PER_DIMENSION[mode]
+            if mode != 'none' and not on_disk:
+                ram += len(ids) * vectors.shape[1] * BYTES_PER_DIMENSION['none']
+            row = {
+                'collection': collection,
+                'config': config,
+                'points': len(ids),
+                'queries': len(queries),
+                'recall': recall_at_k(results, truth, args.k),
+                'p50_ms': float(np.percentile(latencies, 50)) * 1000,
+                'p95_ms': float(np.percentile(latencies, 95)) * 1000,
+                'vector_ram_mb': ram / 1e6,
+            }
+            report.append(row)
+            print(f"{collection:<12} {config:<16} {row['recall']:>9.3f} {row['p50_ms']:>8.2f} "
+                  f"{row['p95_ms']:>8.2f} {row['vector_ram_mb']:>8.1f}")
+            if not args.keep:
+                client.delete_collection(name)
+
+    print("RAM MB is the estimated size of the vectors kept in RAM, excluding the HNSW graph and payloads")
+    if args.output:
+        with open(args.output, 'w') as file:
+            json.dump({'k': args.k, 'results': report}, file, indent=2)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,118 @@
+import os
+import re
+import sys
+import time
+import argparse
+import numpy as np
+
+APP_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'app')
+sys.path.insert(0, APP_DIR)
+from analyzer import CLUBS, analyze_query, club_context
+from catalog import CourseCatalog
+
+QUERIES = [
+    "how is COL106",
+    "best hostel mess",
+    "how to prep for quant interviews",
+    "which prof is taking MTL100 this semester",
+    "what are the prerequisites for COL331",
+    "is APL100 a fakka course",
+    "where do people hang out at night on campus",
+    "how to talk to my crush at rdv",
+    "what companies come for software placements",
+    "study material for electromagnetics",
+    "how does hostel allotment work for freshers",
+    "which clubs should I join in first year",
+    "how to get a research intern abroad",
+    "is it possible to get a dassi in ELL101",
+    "which 3-credit COL courses are in slot A",
+    "compare COL106 and COL202 workload",
+    "what is the scene at SAC on weekends",
+    "how do I balance acads and extracurriculars",
+    "I have a doubt about international exchange in 2023",
+    "should I join DevClub or the robotics club",
+    "top 100 courses to take before graduating",
+    "how to study for 100 marks in col106",
+]
+
+
+# The per-message scans the analyzer replaced, kept here as the baseline
+
+def legacy_extract_course_codes(query):
+    pattern = r'[A-Za-z]{2,3}[\s-]?\d{3}'
+    matches = re.findall(pattern, query, re.IGNORECASE)
+    return [re.sub(r'[\s-]', '', match.upper()) for match in matches]
+
+def legacy_match_query_patterns(query):
+    patterns = {
+        'courses': r'(course|prereq|credit|professor|prof|class|semester|slot|timing|study|material|book)',
+        'interviews': r'(interview|intern|placement|resume|company|job|preparation|study)',
+        'inception': r'(hostel|mess|canteen|lhs|sac|oat|iitd|dassi|satti|fakka|bt)',
+        'united': r'(relationship|dating|crush|love|randi|rizz|breakup|gossip)'
+    }
+    query_lower = query.lower()
+    return {collection for collection, pattern in patterns.items() if re.search(pattern, query_lower)}
+
+def legacy_club_context(query):
+    clubs = dict(CLUBS)
+    club_related_keywords = "|".join(clubs.keys())
+    if re.search(club_related_keywords, query, re.IGNORECASE):
+        return "\n".join(clubs.values())
+    return "No specific club information found in the query."
+
+def legacy(query):
+    return legacy_extract_course_codes(query), legacy_match_query_patterns(query), legacy_club_context(query)
+
+def make_analyzer(departments):
+    def analyzer(query):
+        analysis = analyze_query(query, departments)
+        return analysis.course_codes, analysis.collections, club_context(analysis.clubs)
+    return analyzer
+
+
+def time_per_query(fn, queries, repeats):
+    """Microseconds per query, one sample per pass over the corpus."""
+    samples = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        for query in queries:
+            fn(query)
+        samples.append((time.perf_counter() - start) / len(queries) * 1e6)
+    return samples
+
+def main():
+    parser = argparse.ArgumentParser(description="Time the single-pass query analyzer against the scans it replaced.")
+    parser.add_argument('--repeats', type=int, default=2000)
+    parser.add_argument('--diff', action='store_true', help="Print queries the two disagree on")
+    parser.add_argument('--catalog', default=os.path.join(APP_DIR, '..', 'final_courses.json'),
+                        help="Course JSON whose departments lowercase codes are checked against")
+    args = parser.parse_args()
+
+    departments = CourseCatalog.from_json(args.catalog).departments if os.path.exists(args.catalog) else None
+    if departments is None:
+        print("No course catalog, only uppercase course codes are recognised")
+    analyzer = make_analyzer(departments)
+
+    print(f"{'':<10} {'p50 us':>10} {'p95 us':>10}")
+    results = {}
+    for name, fn in [('legacy', legacy), ('analyzer', analyzer)]:
+        samples = time_per_query(fn, QUERIES, args.repeats)
+        results[name] = np.percentile(samples, 50)
+        print(f"{name:<10} {results[name]:>10.2f} {np.percentile(samples, 95):>10.2f}")
+    print(f"analyzer is {results['legacy'] / results['analyzer']:.1f}x faster per query")
+
+    if args.diff:
+        for query in QUERIES:
+            old_codes, old_collections, old_clubs = legacy(query)
+            new_codes, new_collections, new_clubs = analyzer(query)
+            if (old_codes, old_collections, old_clubs) != (new_codes, new_collections, new_clubs):
+                print(f"\n{query}")
+                if old_codes != new_codes:
+                    print(f"  codes:       {old_codes} -> {new_codes}")
+                if old_collections != new_collections:
+                    print(f"  collections: {sorted(old_collections)} -> {sorted(new_collections)}")
+                if old_clubs != new_clubs:
+                    print(f"  clubs:       {old_clubs.count(chr(10)) + 1} lines -> {new_clubs.count(chr(10)) + 1} lines")
+
+if __name__ == "__main__":
+    main()
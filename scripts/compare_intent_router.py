@@ -0,0 +1,108 @@
+import os
+import sys
+import time
+import argparse
+from groq import Groq
+from sentence_transformers import SentenceTransformer
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'app'))
+from intent import COLLECTIONS, ROUTE_EXAMPLES, IntentRouter, llm_intent_scores
+
+# Same thresholds the app uses when turning scores into collections
+AI_SCORE_THRESHOLD = 0.3
+ROUTER_MIN_CONFIDENCE = 0.45
+
+# Held-out queries, deliberately different from the router's examples
+DEFAULT_QUERIES = [
+    "is COL202 worth taking as an elective",
+    "best hostel mess",
+    "how to prep for quant interviews",
+    "is MTL101 hard for freshers",
+    "what prof is teaching COL380",
+    "what are the credits for ELL205",
+    "which book should I follow for thermodynamics",
+    "how to get a PPO from an intern",
+    "what companies hire for hardware roles",
+    "how to write a resume with no projects",
+    "best places to eat near the main gate",
+    "which hostel is closest to the LHC",
+    "how to find the SAC",
+    "what clubs should a faccha join",
+    "how to ask someone out at rdv",
+    "anyone got gossip about the new couples",
+    "my friend just broke up, how do I help",
+    "is it easy to get a dassi in APL100",
+    "how do I balance acads and placements prep",
+    "what is life like in the first semester",
+]
+
+# A query the router was built from would inflate its agreement with the LLM
+assert not {query.lower() for query in DEFAULT_QUERIES} & {
+    example.lower() for examples in ROUTE_EXAMPLES.values() for example in examples
+}, "DEFAULT_QUERIES overlaps ROUTE_EXAMPLES"
+
+def selected(scores, threshold=AI_SCORE_THRESHOLD):
+    """Collections whose score clears the selection threshold."""
+    return {collection for collection, score in scores.items() if score > threshold}
+
+def top_collection(scores):
+    return max(scores, key=scores.get)
+
+def load_queries(path):
+    if not path:
+        return DEFAULT_QUERIES
+    with open(path, 'r', encoding='utf-8') as file:
+        return [line.strip() for line in file if line.strip()]
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare the local intent router against the LLM intent call.")
+    parser.add_argument('--queries', help="Text file with one query per line (defaults to a built-in set)")
+    parser.add_argument('--model', default="mixtral-8x7b-32768")
+    parser.add_argument('--min-confidence', type=float, default=ROUTER_MIN_CONFIDENCE)
+    args = parser.parse_args()
+
+    groq = Groq(api_key=os.environ["GROQ_API_KEY"])
+    encoder = SentenceTransformer('all-MiniLM-L6-v2')
+    router = IntentRouter(encoder)
+    queries = load_queries(args.queries)
+
+    set_agree = top_agree = effective_agree = fallbacks = 0
+    per_collection_agree = {collection: 0 for collection in COLLECTIONS}
+    router_time = llm_time = 0.0
+
+    for query in queries:
+        start = time.perf_counter()
+        router_scores, confidence = router.score(encoder.encode(query))
+        router_time += time.perf_counter() - start
+
+        start = time.perf_counter()
+        llm_scores = llm_intent_scores(groq, args.model, query)
+        llm_time += time.perf_counter() - start
+
+        router_set, llm_set = selected(router_scores), selected(llm_scores)
+        use_llm = confidence < args.min_confidence
+        fallbacks += use_llm
+
+        set_agree += router_set == llm_set
+        top_agree += top_collection(router_scores) == top_collection(llm_scores)
+        effective_agree += use_llm or router_set == llm_set
+        for collection in COLLECTIONS:
+            per_collection_agree[collection] += (collection in router_set) == (collection in llm_set)
+
+        marker = "LLM" if use_llm else "   "
+        print(f"{marker} conf={confidence:.2f} router={sorted(router_set)} llm={sorted(llm_set)} | {query}")
+
+    n = len(queries)
+    print()
+    print(f"Queries:                         {n}")
+    print(f"Exact collection-set agreement:  {set_agree / n:.1%}")
+    print(f"Top collection agreement:        {top_agree / n:.1%}")
+    print(f"Agreement with LLM fallback:     {effective_agree / n:.1%} "
+          f"(fallback on {fallbacks / n:.1%} of queries at confidence < {args.min_confidence})")
+    for collection in COLLECTIONS:
+        print(f"  {collection:<11} selection agreement: {per_collection_agree[collection] / n:.1%}")
+    print(f"Mean router latency: {router_time / n * 1000:.1f} ms (including encoding)")
+    print(f"Mean LLM latency:    {llm_time / n * 1000:.1f} ms")
+
+if __name__ == "__main__":
+    main()
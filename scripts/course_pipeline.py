@@ -0,0 +1,220 @@
+import os
+import re
+import csv
+import time
+import argparse
+from itertools import islice
+from qdrant_client import QdrantClient
+from qdrant_client.http.models import PointStruct
+from sentence_transformers import SentenceTransformer
+from parse_catalog import parse_catalog
+from indexing import (IndexManifest, add_storage_arguments, delete_points, ensure_collection, ensure_payload_indexes,
+                      point_vectors, sync_collection)
+from planner import COURSE_PAYLOAD_INDEXES
+from vectorize_courses import COLLECTION_NAME, MODEL_NAME, course_points, generate_course_id, prepare_payload
+
+# Load environment variables
+QDRANT_URL = os.getenv('QDRANT_ENDPOINT')
+QDRANT_API_KEY = os.getenv('QDRANT_API_KEY')
+
+COURSE_CODE = re.compile(r'^[A-Z]{3}\d{3}$')
+
+
+class StageTimer:
+    """Times each generator stage of a pipeline.
+
+    Wrapping a stage measures the time spent producing its items, which
+    includes the upstream stages it pulls from; report() subtracts those to get
+    the time spent in each stage itself.
+    """
+
+    def __init__(self):
+        self.stages = []
+
+    def wrap(self, name, iterable):
+        stats = {'name': name, 'total': 0.0, 'items': 0}
+        self.stages.append(stats)
+
+        def timed():
+            iterator = iter(iterable)
+            while True:
+                start = time.perf_counter()
+                try:
+                    item = next(iterator)
+                except StopIteration:
+                    stats['total'] += time.perf_counter() - start
+                    return
+                stats['total'] += time.perf_counter() - start
+                stats['items'] += 1
+                yield item
+
+        return timed()
+
+    def report(self):
+        upstream = 0.0
+        for stats in self.stages:
+            own = stats['total'] - upstream
+            upstream = stats['total']
+            print(f"{stats['name']:<16} {stats['items']:>6} items {own:>8.2f}s")
+        print(f"{'total':<16} {'':>12} {upstream:>8.2f}s")
+
+
+def parse_courses(path):
+    """Stream course records out of the Courses of Study text dump.
+
+    Same rules as scrape_cos_apj.py, but each course is yielded as soon as the
+    next course header is seen instead of being collected into dicts.
+    """
+    course = None
+    with open(path, 'r') as file:
+        for line in file:
+            tokens = line.split()
+            if not tokens:
+                continue
+            if COURSE_CODE.match(tokens[0]):
+                if course:
+                    course['data'] = course['data'].strip()
+                    yield course
+                course = {"course_code": tokens[0], "credits": "", "prerequisites": [], "overlaps": [], "data": ""}
+            if course is None:
+                continue
+
+            if 'Credits' in tokens[1:] or 'Credit' in tokens[1:]:
+                index = tokens.index('Credits') if 'Credits' in tokens else tokens.index('Credit')
+                course['credits'] = "".join(c for c in tokens[index - 1] if c.isdigit() or c == '.')
+                continue
+            if tokens[0] == 'Pre-requisite(s):':
+                course['prerequisites'].extend(token for token in tokens[1:] if len(token) == 6)
+                continue
+            if tokens[0] == 'overlaps':
+                course['overlaps'].extend(tokens[2:])
+                continue
+            course['data'] += line
+    if course:
+        course['data'] = course['data'].strip()
+        yield course
+
+def merge_study_materials(courses, directory):
+    """Attach study material links from <directory>/<code>.txt (as in add_study_materials.py)."""
+    for course in courses:
+        course['study_material'] = []
+        path = os.path.join(directory, f"{course['course_code']}.txt")
+        if os.path.exists(path):
+            with open(path, 'r') as file:
+                lines = file.readlines()
+            course['study_material'] = [line.rstrip('\n') for line in lines[2:-1]]
+        yield course
+
+def load_slots(csv_path):
+    """Index the Courses_offered.csv rows by course code (the CSV is small)."""
+    slots = {}
+    with open(csv_path, 'r') as file:
+        for row in csv.reader(file):
+            if len(row) > 19:
+                slots[row[1][-6:]] = row
+    return slots
+
+def merge_slots(courses, slots):
+    """Fill in this semester's offering details (as in add_slots_to_courses.py)."""
+    for course in courses:
+        row = slots.get(course['course_code'])
+        if row:
+            course['course_name'] = row[1][:-7].strip()
+            course['slot'] = row[3]
+            course['credit_structure'] = row[5]
+            course['instructor'] = row[8].strip()
+            course['instructor_mail'] = row[10]
+            course['lec_time'] = row[13]
+            course['tut_time'] = row[14]
+            course['practical_time'] = row[16]
+            course['vacancy'] = row[18]
+            course['current_strength'] = row[19]
+        yield course
+
+def embed_batches(courses, encoder, batch_size):
+    """Group courses into batches and turn each batch into Qdrant points."""
+    courses = iter(courses)
+    while batch := list(islice(courses, batch_size)):
+        texts = [course.get('data', '') for course in batch]
+        vectors = point_vectors(encoder.encode(texts, batch_size=batch_size), texts)
+        yield [
+            PointStruct(id=generate_course_id(course['course_code']), vector=vector, payload=prepare_payload(course))
+            for course, vector in zip(batch, vectors)
+        ]
+
+def sync_batches(courses, client, manifest, encoder, batch_size, totals):
+    """Sync courses into the collection a batch at a time through the index manifest.
+
+    Only new or re-worded courses are embedded and upserted, each batch is
+    waited on, and totals collects the counts and the IDs seen, so courses gone
+    from the catalog can be deleted once the stream ends.
+    """
+    def encode(texts):
+        return encoder.encode(texts, batch_size=batch_size)
+
+    courses = iter(courses)
+    while batch := list(islice(courses, batch_size)):
+        points = course_points({course['course_code']: course for course in batch})
+        totals['seen'].update(str(point_id) for point_id in points)
+        embedded, updated, _ = sync_collection(client, manifest, COLLECTION_NAME, points, MODEL_NAME, encode,
+                                               batch_size=batch_size, delete_missing=False)
+        totals['embedded'] += embedded
+        totals['updated'] += updated
+        yield len(points)
+
+def main():
+    parser = argparse.ArgumentParser(description="Parse, enrich, embed and upsert courses in one streaming pass.")
+    parser.add_argument('--courses-text', default='CoursesofStudy.txt')
+    parser.add_argument('--courses-pdf', help="Parse the Courses of Study PDF in parallel instead of the text dump")
+    parser.add_argument('--study-materials', default='.', help="Directory with <code>.txt study material files")
+    parser.add_argument('--slots', default='Courses_offered.csv')
+    parser.add_argument('--batch-size', type=int, default=64)
+    parser.add_argument('--dry-run', action='store_true',
+                        help="Parse, enrich and embed every course without touching Qdrant or the manifest")
+    parser.add_argument('--manifest', default='index_manifest',
+                        help="Directory with the local record of indexed points, one file per collection")
+    parser.add_argument('--full', action='store_true', help="Ignore the manifest: re-index everything and delete points no longer in the source")
+    parser.add_argument('--recreate', action='store_true', help="Drop and rebuild the collection")
+    add_storage_arguments(parser)
+    args = parser.parse_args()
+
+    encoder = SentenceTransformer(MODEL_NAME)
+    timer = StageTimer()
+
+    if args.courses_pdf:
+        stream = timer.wrap('parse', parse_catalog(args.courses_pdf))
+    else:
+        stream = timer.wrap('parse', parse_courses(args.courses_text))
+    stream = timer.wrap('study materials', merge_study_materials(stream, args.study_materials))
+    stream = timer.wrap('slots', merge_slots(stream, load_slots(args.slots)))
+    if args.dry_run:
+        stream = timer.wrap('embed', embed_batches(stream, encoder, args.batch_size))
+        for _ in stream:
+            pass
+        timer.report()
+        return
+
+    client = QdrantClient(url=QDRANT_URL, api_key=QDRANT_API_KEY)
+    manifest = IndexManifest(args.manifest)
+    ensure_collection(client, COLLECTION_NAME, encoder.get_sentence_embedding_dimension(), manifest, args.recreate,
+                      args.quantization, args.on_disk)
+    if args.full:
+        # Start from what Qdrant actually holds so stale points get deleted too
+        manifest.reset_from_collection(client, COLLECTION_NAME)
+    ensure_payload_indexes(client, COLLECTION_NAME, COURSE_PAYLOAD_INDEXES)
+
+    totals = {'seen': set(), 'embedded': 0, 'updated': 0}
+    stream = timer.wrap('embed + upsert', sync_batches(stream, client, manifest, encoder, args.batch_size, totals))
+    for _ in stream:
+        pass
+    # Only after the whole catalog went through, and never for an empty parse
+    deleted = 0
+    if totals['seen']:
+        stale = [key for key in manifest.point_ids(COLLECTION_NAME) if key not in totals['seen']]
+        deleted = delete_points(client, manifest, COLLECTION_NAME, stale)
+    timer.report()
+    print(f"{COLLECTION_NAME}: {len(totals['seen'])} courses, {totals['embedded']} embedded, "
+          f"{totals['updated']} payloads updated, {deleted} deleted")
+
+if __name__ == "__main__":
+    main()
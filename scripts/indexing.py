@@ -0,0 +1,278 @@
+import os
+import sys
+import json
+import hashlib
+import argparse
+from typing import Dict, List, Optional, Tuple
+from qdrant_client import models
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'app'))
+from lexical import SPARSE_VECTOR_NAME, sparse_vector
+from quantization import QUANTIZATION_MODES, quantization_config, quantization_mode
+
+
+def content_hash(value, salt: str = "") -> str:
+    """Stable hash of a JSON-serializable value, optionally salted (e.g. with the model name)."""
+    data = json.dumps(value, sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha256((salt + "\0" + data).encode('utf-8')).hexdigest()
+
+
+class IndexManifest:
+    """Local record of what has been indexed into each Qdrant collection.
+
+    Every point keeps two hashes: one of the text that was embedded, salted
+    with the embedding model name, and one of the payload. A payload-only
+    change can then be written without re-embedding. Each collection is kept
+    in its own file under the manifest directory, so scripts indexing
+    different collections can run at the same time.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.collections = {}
+        self.changed = set()
+
+    def _file(self, collection: str) -> str:
+        return os.path.join(self.path, f"{collection}.json")
+
+    def _load(self, collection: str) -> Dict[str, Dict[str, str]]:
+        if collection not in self.collections:
+            indexed = {}
+            if os.path.exists(self._file(collection)):
+                with open(self._file(collection), 'r') as file:
+                    indexed = json.load(file)
+            self.collections[collection] = indexed
+        return self.collections[collection]
+
+    def plan(self, collection: str, entries: Dict[str, Dict[str, str]]) -> Tuple[List[str], List[str], List[str]]:
+        """Compare current entries ({point_id: {'vector': hash, 'payload': hash}}) with the manifest.
+
+        Returns the point IDs to embed and upsert, the IDs that only need a
+        payload update and the IDs that were removed from the source.
+        """
+        indexed = self._load(collection)
+        to_embed, to_update, to_delete = [], [], []
+        for point_id, hashes in entries.items():
+            previous = indexed.get(point_id)
+            if previous is None or previous['vector'] != hashes['vector']:
+                to_embed.append(point_id)
+            elif previous['payload'] != hashes['payload']:
+                to_update.append(point_id)
+        to_delete = [point_id for point_id in indexed if point_id not in entries]
+        return to_embed, to_update, to_delete
+
+    def record(self, collection: str, entries: Dict[str, Dict[str, str]], point_ids: List[str]) -> None:
+        indexed = self._load(collection)
+        for point_id in point_ids:
+            indexed[point_id] = entries[point_id]
+        self.changed.add(collection)
+
+    def point_ids(self, collection: str) -> List[str]:
+        return list(self._load(collection))
+
+    def forget(self, collection: str, point_ids: List[str] = None) -> None:
+        """Drop some points, or the whole collection when no IDs are given."""
+        if point_ids is None:
+            self.collections[collection] = {}
+        else:
+            indexed = self._load(collection)
+            for point_id in point_ids:
+                indexed.pop(point_id, None)
+        self.changed.add(collection)
+
+    def reset_from_collection(self, client, collection: str) -> None:
+        """Replace the record with the point IDs actually in Qdrant, without hashes.
+
+        Every source point is then re-embedded, and points Qdrant holds that
+        the source no longer has are deleted.
+        """
+        indexed, offset = {}, None
+        while True:
+            points, offset = client.scroll(collection_name=collection, limit=1000, offset=offset,
+                                           with_payload=False, with_vectors=False)
+            for point in points:
+                indexed[str(point.id)] = {'vector': None, 'payload': None}
+            if offset is None:
+                break
+        self.collections[collection] = indexed
+        self.changed.add(collection)
+
+    def save(self) -> None:
+        """Write the collections changed since the last save."""
+        os.makedirs(self.path, exist_ok=True)
+        for collection in self.changed:
+            # Write to a temporary file first so an interrupted run can't corrupt the manifest
+            path = self._file(collection)
+            tmp_path = path + ".tmp"
+            with open(tmp_path, 'w') as file:
+                json.dump(self.collections[collection], file, indent=1, sort_keys=True)
+            os.replace(tmp_path, path)
+        self.changed.clear()
+
+
+class BatchEncoder:
+    """Encodes texts in batches, across one worker process per core when workers > 1.
+
+    The worker pool is only started the first time there is something to
+    encode, so runs where nothing changed don't pay for loading the model N times.
+    """
+
+    def __init__(self, embedder, batch_size, workers):
+        self.embedder = embedder
+        self.batch_size = batch_size
+        self.workers = workers
+        self.pool = None
+
+    def __call__(self, texts):
+        if self.workers > 1 and len(texts) > self.batch_size:
+            if self.pool is None:
+                self.pool = self.embedder.start_multi_process_pool(['cpu'] * self.workers)
+            return self.embedder.encode_multi_process(texts, self.pool, batch_size=self.batch_size)
+        return self.embedder.encode(texts, batch_size=self.batch_size, show_progress_bar=True)
+
+    def close(self):
+        if self.pool is not None:
+            self.embedder.stop_multi_process_pool(self.pool)
+            self.pool = None
+
+
+def ensure_collection(client, collection_name: str, vector_size: int, manifest: IndexManifest = None,
+                      recreate: bool = False, quantization: Optional[str] = None,
+                      on_disk: Optional[bool] = None) -> None:
+    """Create the collection with a dense vector and a BM25 sparse vector if it's missing.
+
+    A collection created before the sparse vector existed has to be rebuilt,
+    which only happens with recreate=True. quantization ('none', 'int8' or
+    'binary') and on_disk (keep the fp32 originals on disk) apply to new
+    collections and are changed in place on existing ones; left as None,
+    existing collections keep their storage and new ones are plain fp32 in RAM.
+    """
+    if client.collection_exists(collection_name):
+        sparse_vectors = client.get_collection(collection_name).config.params.sparse_vectors or {}
+        if not recreate:
+            if SPARSE_VECTOR_NAME not in sparse_vectors:
+                raise SystemExit(f"Collection {collection_name} has no '{SPARSE_VECTOR_NAME}' sparse vector; "
+                                 f"rerun with --recreate to rebuild it")
+            configure_storage(client, collection_name, quantization, on_disk)
+            return
+        client.delete_collection(collection_name)
+
+    if manifest is not None:
+        manifest.forget(collection_name)
+    client.create_collection(
+        collection_name=collection_name,
+        vectors_config=models.VectorParams(size=vector_size, distance=models.Distance.COSINE, on_disk=bool(on_disk)),
+        sparse_vectors_config={SPARSE_VECTOR_NAME: models.SparseVectorParams(modifier=models.Modifier.IDF)},
+        quantization_config=quantization_config(quantization or 'none'),
+    )
+
+def configure_storage(client, collection_name: str, quantization: Optional[str] = None,
+                      on_disk: Optional[bool] = None) -> None:
+    """Change an existing collection's quantization or on-disk originals without re-uploading.
+
+    Qdrant rebuilds the quantized vectors in the background; searches keep
+    working meanwhile.
+    """
+    config = client.get_collection(collection_name).config
+    changes = {}
+    if quantization is not None and quantization != quantization_mode(config.quantization_config):
+        changes['quantization_config'] = quantization_config(quantization) or models.Disabled.DISABLED
+    if on_disk is not None and on_disk != bool(config.params.vectors.on_disk):
+        changes['vectors_config'] = {"": models.VectorParamsDiff(on_disk=on_disk)}
+    if changes:
+        client.update_collection(collection_name=collection_name, **changes)
+        print(f"{collection_name}: storage set to quantization={quantization or quantization_mode(config.quantization_config)}, "
+              f"on_disk={config.params.vectors.on_disk if on_disk is None else on_disk}")
+
+def add_storage_arguments(parser) -> None:
+    """--quantization and --on-disk flags shared by the ingestion scripts."""
+    parser.add_argument('--quantization', choices=QUANTIZATION_MODES,
+                        help="Dense vector quantization; existing collections are converted in place. "
+                             "Search with the same QUANTIZATION setting in the app")
+    parser.add_argument('--on-disk', action=argparse.BooleanOptionalAction, default=None,
+                        help="Keep the fp32 original vectors on disk, read only to rescore quantized hits")
+
+def ensure_payload_indexes(client, collection_name: str, schema: Dict) -> None:
+    """Create any missing payload indexes, given as {field name: schema type}."""
+    existing = client.get_collection(collection_name).payload_schema or {}
+    for field_name, field_schema in schema.items():
+        if field_name not in existing:
+            client.create_payload_index(collection_name=collection_name, field_name=field_name,
+                                        field_schema=field_schema, wait=True)
+
+def point_vectors(dense_vectors, texts) -> List[Dict]:
+    """Per-point vectors: the default dense vector plus the named sparse one."""
+    return [
+        {"": list(map(float, dense)), SPARSE_VECTOR_NAME: sparse_vector(text)}
+        for dense, text in zip(dense_vectors, texts)
+    ]
+
+def parse_point_id(key: str):
+    """Manifest keys are strings; Qdrant IDs are unsigned ints or UUIDs."""
+    return int(key) if key.isdigit() and len(key) < 20 else key
+
+def delete_points(client, manifest: IndexManifest, collection_name: str, keys: List[str]) -> int:
+    """Delete points by manifest key from the collection and the manifest; returns how many."""
+    if keys:
+        client.delete(
+            collection_name=collection_name,
+            points_selector=models.PointIdsList(points=[parse_point_id(key) for key in keys])
+        )
+        manifest.forget(collection_name, keys)
+        manifest.save()
+    return len(keys)
+
+def sync_collection(client, manifest: IndexManifest, collection_name: str, points: Dict, model_name: str,
+                    encode, batch_size: int = 256, parallel: int = 1,
+                    delete_missing: bool = True) -> Tuple[int, int, int]:
+    """Bring a collection in line with its source, touching only what changed.
+
+    points maps each point ID to (text to embed, payload). New or re-worded
+    points are embedded with encode(texts), given a BM25 sparse vector of the
+    same text and upserted, points whose payload
+    alone changed get the payload rewritten, and points gone from the source
+    are deleted. Returns (embedded, payload updates, deleted) counts.
+
+    When points is only part of the source (a batch of a stream), pass
+    delete_missing=False and call delete_points for the rest once the stream ends.
+    """
+    # The sparse scheme is part of the salt so points indexed without it get re-embedded
+    vector_salt = f"{model_name}+{SPARSE_VECTOR_NAME}"
+    entries = {
+        str(point_id): {'vector': content_hash(text, vector_salt), 'payload': content_hash(payload)}
+        for point_id, (text, payload) in points.items()
+    }
+    ids = {str(point_id): point_id for point_id in points}
+    to_embed, to_update, to_delete = manifest.plan(collection_name, entries)
+
+    if to_embed:
+        texts = [points[ids[key]][0] for key in to_embed]
+        client.upload_collection(
+            collection_name=collection_name,
+            vectors=point_vectors(encode(texts), texts),
+            payload=[points[ids[key]][1] for key in to_embed],
+            ids=[ids[key] for key in to_embed],
+            batch_size=batch_size,
+            parallel=parallel,
+            wait=True
+        )
+        manifest.record(collection_name, entries, to_embed)
+        manifest.save()
+
+    for start in range(0, len(to_update), batch_size):
+        batch = to_update[start:start + batch_size]
+        client.batch_update_points(
+            collection_name=collection_name,
+            update_operations=[
+                models.OverwritePayloadOperation(
+                    overwrite_payload=models.SetPayload(payload=points[ids[key]][1], points=[ids[key]])
+                )
+                for key in batch
+            ]
+        )
+        manifest.record(collection_name, entries, batch)
+    if to_update:
+        manifest.save()
+
+    deleted = delete_points(client, manifest, collection_name, to_delete) if delete_missing else 0
+    return len(to_embed), len(to_update), deleted
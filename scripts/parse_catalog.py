@@ -0,0 +1,134 @@
+import os
+import re
+import json
+import argparse
+from concurrent.futures import ProcessPoolExecutor
+import PyPDF2
+
+# Patterns are compiled once and each course block is scanned once, when it ends
+PAGE_NUMBER = re.compile(r'^\d+$')
+COURSE_HEADER = re.compile(r'^[A-Z]{3}\d{3}\b')
+PREREQ_LINE = re.compile(r'^Pre-requisite\(s\):\s*(.*)$')
+# Searched anywhere in a line, since overlap notes can start mid-line after wrapping
+OVERLAP_LINE = re.compile(r'Overlaps with\s*:\s*(.*)$', re.IGNORECASE)
+CREDITS = re.compile(r'(\d+(?:\.\d+)?)\s*Credits?\s*\((\d+(?:\.\d+)?-\d+(?:\.\d+)?-\d+(?:\.\d+)?)\)')
+LIST_SEPARATORS = re.compile(r'\s*(?:,|/|\bor\b|\band\b)\s*')
+
+# Line-break artifacts from the PDF text layer (see scrape_cos_sps.py); each
+# spans at most one line break
+PAGE_FIXES = [
+    (re.compile(r'ov\nerlaps with[ ]:', re.IGNORECASE), 'Overlaps with:'),
+    (re.compile(r'C\nol', re.IGNORECASE), 'COL'),
+    (re.compile(r'EC 50', re.IGNORECASE), ',EC50'),
+    (re.compile(r' EC50', re.IGNORECASE), ',EC50'),
+]
+
+_reader = None
+
+def _open_reader(pdf_path):
+    global _reader
+    _reader = PyPDF2.PdfReader(pdf_path)
+
+def _extract_pages(page_range):
+    """Worker: extract the text of a run of pages."""
+    start, stop = page_range
+    return [_reader.pages[page_number].extract_text() or "" for page_number in range(start, stop)]
+
+def extract_pages(pdf_path, workers=None, pages_per_task=8):
+    """Yield page texts in order while a process pool extracts them in parallel."""
+    page_count = len(PyPDF2.PdfReader(pdf_path).pages)
+    ranges = [(start, min(start + pages_per_task, page_count)) for start in range(0, page_count, pages_per_task)]
+    with ProcessPoolExecutor(max_workers=workers, initializer=_open_reader, initargs=(pdf_path,)) as pool:
+        for texts in pool.map(_extract_pages, ranges):
+            yield from texts
+
+def clean_pages(pages):
+    """Drop page numbers and fix line-break artifacts, including ones split across a page break.
+
+    The last line of each page is held back until the next page arrives, so
+    the fixes see the text as if the pages were joined.
+    """
+    carry = None
+    for page in pages:
+        lines = [line for line in page.split('\n') if not PAGE_NUMBER.match(line.strip())]
+        text = "\n".join(([carry] if carry is not None else []) + lines)
+        for pattern, replacement in PAGE_FIXES:
+            text = pattern.sub(replacement, text)
+        text, _, carry = text.rpartition('\n')
+        if text:
+            yield text
+    if carry:
+        yield carry
+
+def split_list(text):
+    return [item for item in LIST_SEPARATORS.split(text.strip()) if item]
+
+def build_record(code, lines):
+    """Turn the lines of one course block into a course record."""
+    prerequisites, overlaps, description = [], [], []
+    for line in lines:
+        prereq_match = PREREQ_LINE.match(line)
+        if prereq_match:
+            prerequisites.extend(split_list(prereq_match.group(1)))
+            continue
+        overlap_match = OVERLAP_LINE.search(line)
+        if overlap_match:
+            before = line[:overlap_match.start()].strip()
+            if before:
+                description.append(before)
+            # Handle cases like COL100 approx 80%
+            overlaps.extend(item.split('approx')[0].strip() for item in split_list(overlap_match.group(1)))
+            continue
+        description.append(line)
+
+    text = "\n".join(description)
+    credit_match = CREDITS.search(text)
+    return {
+        "course_code": code,
+        "credits": credit_match.group(1) if credit_match else "",
+        "credit_structure": credit_match.group(2) if credit_match else "",
+        "prerequisites": prerequisites,
+        "overlaps": [overlap for overlap in overlaps if overlap],
+        "data": text,
+    }
+
+def parse_pages(pages):
+    """Stream course records out of page texts, one record per course block.
+
+    A code that heads several blocks yields several records; collecting them
+    into a dict keeps the last, as scrape_cos_sps.py does.
+    """
+    code, lines = None, []
+    for page in pages:
+        for line in page.split('\n'):
+            line = line.strip()
+            if not line or PAGE_NUMBER.match(line):
+                continue
+            header = COURSE_HEADER.match(line)
+            if header and 'Pre-requisite(s):' not in line:
+                if code:
+                    yield build_record(code, lines)
+                code, lines = header.group(0), [line]
+            elif code:
+                lines.append(line)
+    if code:
+        yield build_record(code, lines)
+
+def parse_catalog(pdf_path, workers=None):
+    """Parse the Courses of Study PDF into a stream of course records."""
+    return parse_pages(clean_pages(extract_pages(pdf_path, workers)))
+
+def main():
+    parser = argparse.ArgumentParser(description="Parse the Courses of Study PDF into course records.")
+    parser.add_argument('pdf', nargs='?', default='Courses of Study 2023-24.pdf')
+    parser.add_argument('--output', default='course_catalog.json')
+    parser.add_argument('--workers', type=int, default=os.cpu_count())
+    args = parser.parse_args()
+
+    catalog = {record['course_code']: record for record in parse_catalog(args.pdf, args.workers)}
+    with open(args.output, 'w', encoding='utf-8') as f:
+        json.dump(catalog, f, indent=2, ensure_ascii=False)
+    print(f"Wrote {len(catalog)} courses to {args.output}")
+
+if __name__ == "__main__":
+    main()
@@ -1,43 +1,18 @@
 import os
+import io
 import time
 import re
 import json
+import random
+import hashlib
+import argparse
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
 from PyPDF2 import PdfReader, PdfWriter
 from langchain.text_splitter import RecursiveCharacterTextSplitter
-import google.generativeai as genai
 
-genai.configure(api_key=os.environ["GEMINI_API_KEY"])
-
-def upload_to_gemini(path, mime_type=None):
-    """Uploads the given file to Gemini.
-
-    See https://ai.google.dev/gemini-api/docs/prompting_with_media
-    """
-    file = genai.upload_file(path, mime_type=mime_type)
-    print(f"Uploaded file '{file.display_name}' as: {file.uri}")
-    return file
-
-def wait_for_files_active(files):
-    """Waits for the given files to be active.
-
-    Some files uploaded to the Gemini API need to be processed before they can be
-    used as prompt inputs. The status can be seen by querying the file's "state"
-    field.
-
-    This implementation uses a simple blocking polling loop. Production code
-    should probably employ a more sophisticated approach.
-    """
-    print("Waiting for file processing...")
-    for name in (file.name for file in files):
-        file = genai.get_file(name)
-        while file.state.name == "PROCESSING":
-            print(".", end="", flush=True)
-            time.sleep(10)
-            file = genai.get_file(name)
-        if file.state.name != "ACTIVE":
-            raise Exception(f"File {file.name} failed to process")
-    print("...all files ready")
-    print()
+EXTRACTION_PROMPT = "give me raw text from this pdf file"
+MODEL_NAME = "gemini-1.5-flash-8b"
 
 # Create the model
 generation_config = {
@@ -48,22 +23,168 @@ generation_config = {
     "response_mime_type": "text/plain",
 }
 
-model = genai.GenerativeModel(
-    model_name="gemini-1.5-flash-8b",
-    generation_config=generation_config,
-)
-
-def split_and_upload_pdf(file_path):
-    pdf = PdfReader(open(file_path, "rb"))
-    files = []
-    for page_num in range(len(pdf.pages)):
-        output_path = f"page_{page_num + 1}.pdf"
-        with open(output_path, "wb") as output_file:
-            pdf_writer = PdfWriter()
-            pdf_writer.add_page(pdf.pages[page_num])
-            pdf_writer.write(output_file)
-        files.append(upload_to_gemini(output_path, mime_type="application/pdf"))
-    return files
+
+class GeminiExtractor:
+    """Extracts the raw text of a single-page PDF with Gemini."""
+
+    # Part of the cache key, so changing the model or prompt re-extracts every page
+    identity = f"gemini:{MODEL_NAME}:{EXTRACTION_PROMPT}"
+
+    def __init__(self):
+        import google.generativeai as genai
+        genai.configure(api_key=os.environ["GEMINI_API_KEY"])
+        self.genai = genai
+        self.model = genai.GenerativeModel(
+            model_name=MODEL_NAME,
+            generation_config=generation_config,
+        )
+
+    def wait_for_file_active(self, file, timeout=300):
+        """Poll the uploaded file until Gemini has processed it, backing off between polls."""
+        delay = 1.0
+        deadline = time.monotonic() + timeout
+        file = self.genai.get_file(file.name)
+        while file.state.name == "PROCESSING":
+            if time.monotonic() > deadline:
+                raise TimeoutError(f"File {file.name} still processing after {timeout}s")
+            time.sleep(delay)
+            delay = min(delay * 2, 10.0)
+            file = self.genai.get_file(file.name)
+        if file.state.name != "ACTIVE":
+            raise Exception(f"File {file.name} failed to process")
+        return file
+
+    def __call__(self, page_pdf: bytes) -> str:
+        with tempfile.NamedTemporaryFile(suffix=".pdf", delete=False) as tmp:
+            tmp.write(page_pdf)
+        try:
+            file = self.genai.upload_file(tmp.name, mime_type="application/pdf")
+        finally:
+            os.unlink(tmp.name)
+        try:
+            file = self.wait_for_file_active(file)
+            chat_session = self.model.start_chat(
+                history=[
+                    {
+                        "role": "user",
+                        "parts": [
+                            file,
+                            EXTRACTION_PROMPT,
+                        ],
+                    },
+                ]
+            )
+            response = chat_session.send_message("INSERT_INPUT_HERE")
+            return response.text
+        finally:
+            # Uploads otherwise pile up against the project's file storage quota
+            try:
+                self.genai.delete_file(file.name)
+            except Exception as e:
+                print(f"Error deleting uploaded file {file.name}: {e}")
+
+
+class StubExtractor:
+    """Local stand-in for the extraction endpoint.
+
+    Returns PyPDF2's own text for the page after a simulated latency and fails
+    a fraction of calls, to exercise concurrency, retries and the cache offline.
+    """
+
+    # Keeps stub output out of the cache entries real extractions use
+    identity = "stub:pypdf2"
+
+    def __init__(self, latency=0.5, failure_rate=0.1):
+        self.latency = latency
+        self.failure_rate = failure_rate
+
+    def __call__(self, page_pdf: bytes) -> str:
+        time.sleep(self.latency)
+        if random.random() < self.failure_rate:
+            raise ConnectionError("stub extraction endpoint failed")
+        return PdfReader(io.BytesIO(page_pdf)).pages[0].extract_text() or ""
+
+
+class ExtractionCache:
+    """On-disk cache of extracted page text keyed by a hash of the extractor and the page."""
+
+    def __init__(self, directory):
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+
+    def path(self, key):
+        return os.path.join(self.directory, f"{key}.txt")
+
+    def get(self, key):
+        if os.path.exists(self.path(key)):
+            with open(self.path(key), 'r', encoding='utf-8') as file:
+                return file.read()
+        return None
+
+    def set(self, key, text):
+        tmp_path = self.path(key) + ".tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as file:
+            file.write(text)
+        os.replace(tmp_path, self.path(key))
+
+
+def split_pdf(file_path, identity):
+    """Split the PDF into single-page PDFs held in memory, each keyed by a hash of the extractor and the page.
+
+    The key covers the whole serialized page, images and fonts included, so
+    scanned pages with identical content streams don't collide.
+    """
+    pdf = PdfReader(file_path)
+    pages = []
+    for page in pdf.pages:
+        pdf_writer = PdfWriter()
+        pdf_writer.add_page(page)
+        buffer = io.BytesIO()
+        pdf_writer.write(buffer)
+        page_pdf = buffer.getvalue()
+        key = hashlib.sha256(identity.encode() + b"\0" + page_pdf).hexdigest()
+        pages.append((key, page_pdf))
+    return pages
+
+def is_transient(error):
+    """Whether a failed extraction is worth retrying: rate limits, server errors and dropped connections.
+
+    Google API errors carry their HTTP status in `code`; a TimeoutError from a
+    file stuck processing or a rejected request would fail the same way again.
+    """
+    if isinstance(error, ConnectionError):
+        return True
+    code = getattr(error, 'code', None)
+    return isinstance(code, int) and (code == 429 or 500 <= code < 600)
+
+def with_retries(fn, attempts=5, base_delay=1.0, max_delay=30.0):
+    """Call fn, retrying transient failures with exponential backoff and full jitter."""
+    for attempt in range(attempts):
+        try:
+            return fn()
+        except Exception as e:
+            if attempt == attempts - 1 or not is_transient(e):
+                raise
+            delay = random.uniform(0, min(max_delay, base_delay * 2 ** attempt))
+            print(f"Extraction failed ({e}), retrying in {delay:.1f}s")
+            time.sleep(delay)
+
+def extract_pages(pages, extractor, cache, concurrency=4):
+    """Extract every page's text, at most `concurrency` at a time, skipping cached pages."""
+    def extract(page_number, key, page_pdf):
+        text = cache.get(key)
+        if text is None:
+            text = with_retries(lambda: extractor(page_pdf))
+            cache.set(key, text)
+            print(f"Extracted page {page_number}")
+        return text
+
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        futures = [
+            pool.submit(extract, page_number, key, page_pdf)
+            for page_number, (key, page_pdf) in enumerate(pages, start=1)
+        ]
+        return [future.result() for future in futures]
 
 def clean_text(text):
     """Cleans the input text by removing unwanted characters and extra spaces."""
@@ -80,40 +201,44 @@ def sliding_window(text, window_size, step_size):
     )
     return text_splitter.split_text(text)
 
-# Split the PDF and upload each page
-files = split_and_upload_pdf("Inception.pdf")
-
-# Some files have a processing delay. Wait for them to be ready.
-wait_for_files_active(files)
-
-# Process each page individually
-all_chunks = []
-for file in files:
-    chat_session = model.start_chat(
-        history=[
-            {
-                "role": "user",
-                "parts": [
-                    file,
-                    "give me raw text from this pdf file",
-                ],
-            },
-        ]
-    )
-
-    response = chat_session.send_message("INSERT_INPUT_HERE")
-
-    # Clean the response text
-    cleaned_text = clean_text(response.text)
-
-    # Perform sliding window to create chunks
-    window_size = 1000  # Adjust the window size as needed
-    step_size = 500     # Adjust the step size as needed
-    chunks = sliding_window(cleaned_text, window_size, step_size)
-
-    # Collect all chunks
-    all_chunks.extend([{"chunk_id": len(all_chunks) + i + 1, "text": chunk} for i, chunk in enumerate(chunks)])
-
-# Save chunks to JSON file
-with open("cleaned_inception.json", "w") as json_file:
-    json.dump(all_chunks, json_file, indent=2)
+def main():
+    parser = argparse.ArgumentParser(description="Extract, clean and chunk the Inception magazine.")
+    parser.add_argument('pdf', nargs='?', default="Inception.pdf")
+    parser.add_argument('--output', default="cleaned_inception.json")
+    parser.add_argument('--concurrency', type=int, default=4, help="Pages extracted at the same time")
+    parser.add_argument('--cache-dir', default=".extraction_cache")
+    parser.add_argument('--stub', action='store_true', help="Use a local stub instead of Gemini")
+    parser.add_argument('--stub-latency', type=float, default=0.5)
+    parser.add_argument('--stub-failure-rate', type=float, default=0.1)
+    args = parser.parse_args()
+
+    if args.stub:
+        extractor = StubExtractor(args.stub_latency, args.stub_failure_rate)
+    else:
+        extractor = GeminiExtractor()
+
+    start = time.perf_counter()
+    pages = split_pdf(args.pdf, extractor.identity)
+    texts = extract_pages(pages, extractor, ExtractionCache(args.cache_dir), args.concurrency)
+    print(f"Extracted {len(pages)} pages in {time.perf_counter() - start:.1f}s")
+
+    # Process each page individually
+    all_chunks = []
+    for text in texts:
+        # Clean the response text
+        cleaned_text = clean_text(text)
+
+        # Perform sliding window to create chunks
+        window_size = 1000  # Adjust the window size as needed
+        step_size = 500     # Adjust the step size as needed
+        chunks = sliding_window(cleaned_text, window_size, step_size)
+
+        # Collect all chunks
+        all_chunks.extend([{"chunk_id": len(all_chunks) + i + 1, "text": chunk} for i, chunk in enumerate(chunks)])
+
+    # Save chunks to JSON file
+    with open(args.output, "w") as json_file:
+        json.dump(all_chunks, json_file, indent=2)
+
+if __name__ == "__main__":
+    main()
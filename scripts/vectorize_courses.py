@@ -0,0 +1,97 @@
+import os
+import json
+import time
+import argparse
+from qdrant_client import QdrantClient
+from sentence_transformers import SentenceTransformer
+from indexing import (BatchEncoder, IndexManifest, add_storage_arguments, ensure_collection, ensure_payload_indexes,
+                      sync_collection)
+from planner import COURSE_PAYLOAD_INDEXES, course_payload_fields
+from catalog import generate_course_id
+
+# Load environment variables
+QDRANT_URL = os.getenv('QDRANT_ENDPOINT')
+QDRANT_API_KEY = os.getenv('QDRANT_API_KEY')
+
+MODEL_NAME = 'all-MiniLM-L6-v2'
+COLLECTION_NAME = 'courses'
+
+# Function to normalize strings
+def normalize_string(value: str) -> str:
+    return value.strip().lower() if isinstance(value, str) else value
+
+# Function to prepare the payload with optional extended schema
+def prepare_payload(course):
+    # Always normalize core fields, even if extended data is missing
+    return {
+        "course_code": course.get("course_code"),
+        "course_name": normalize_string(course.get("course_name", "")),
+        "credits": course.get("credits", ""),
+        "prerequisites": course.get("prerequisites", []),
+        "overlaps": course.get("overlaps", []),
+        "slot": normalize_string(course.get("slot", "")),
+        "credit_structure": course.get("credit_structure", ""),
+        "instructor": normalize_string(course.get("instructor", "")),
+        "instructor_mail": normalize_string(course.get("instructor_mail", "")),
+        "lec_time": course.get("lec_time", ""),
+        "tut_time": course.get("tut_time", ""),
+        "practical_time": course.get("practical_time", ""),
+        "vacancy": course.get("vacancy", ""),
+        "current_strength": course.get("current_strength", ""),
+        "data": normalize_string(course.get("data", "")),
+        "study_material": course.get("study_material", []),
+        # Department, level and numeric credits for the app's payload filters
+        **course_payload_fields(course.get("course_code"), course.get("credits"))
+    }
+
+def course_points(courses):
+    """Map course IDs to the text to embed and the payload to store."""
+    return {
+        generate_course_id(code): (course.get("data", ""), prepare_payload({"course_code": code, **course}))
+        for code, course in courses.items()
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description="Index final_courses.json into the courses collection, incrementally.")
+    parser.add_argument('--courses', default='final_courses.json')
+    parser.add_argument('--batch-size', type=int, default=64, help="Courses per encoder batch")
+    parser.add_argument('--workers', type=int, default=os.cpu_count(),
+                        help="Encoder processes; 1 encodes in this process")
+    parser.add_argument('--upload-batch-size', type=int, default=256, help="Points per upsert request")
+    parser.add_argument('--upload-workers', type=int, default=4, help="Parallel upload processes")
+    parser.add_argument('--manifest', default='index_manifest',
+                        help="Directory with the local record of indexed points, one file per collection")
+    parser.add_argument('--full', action='store_true', help="Ignore the manifest: re-index everything and delete points no longer in the source")
+    parser.add_argument('--recreate', action='store_true', help="Drop and rebuild the collection")
+    add_storage_arguments(parser)
+    args = parser.parse_args()
+
+    with open(args.courses, 'r') as file:
+        courses = json.load(file)
+
+    client = QdrantClient(url=QDRANT_URL, api_key=QDRANT_API_KEY)
+    embedder = SentenceTransformer(MODEL_NAME)
+    manifest = IndexManifest(args.manifest)
+
+    ensure_collection(client, COLLECTION_NAME, embedder.get_sentence_embedding_dimension(), manifest, args.recreate,
+                      args.quantization, args.on_disk)
+    if args.full:
+        # Start from what Qdrant actually holds so stale points get deleted too
+        manifest.reset_from_collection(client, COLLECTION_NAME)
+    ensure_payload_indexes(client, COLLECTION_NAME, COURSE_PAYLOAD_INDEXES)
+
+    batch_encoder = BatchEncoder(embedder, args.batch_size, args.workers)
+    try:
+        start = time.perf_counter()
+        embedded, updated, deleted = sync_collection(
+            client, manifest, COLLECTION_NAME, course_points(courses), MODEL_NAME, batch_encoder,
+            batch_size=args.upload_batch_size, parallel=args.upload_workers
+        )
+    finally:
+        batch_encoder.close()
+
+    print(f"{COLLECTION_NAME}: {len(courses)} courses, {embedded} embedded, {updated} payloads updated, "
+          f"{deleted} deleted in {time.perf_counter() - start:.1f}s")
+
+if __name__ == "__main__":
+    main()
@@ -1,49 +1,95 @@
 import os
 import json
-from tqdm import tqdm
+import time
+import argparse
 from qdrant_client import QdrantClient
 from sentence_transformers import SentenceTransformer
+from indexing import BatchEncoder, IndexManifest, add_storage_arguments, ensure_collection, sync_collection
 
 # Load environment variables
 QDRANT_URL = os.getenv('QDRANT_ENDPOINT')
 QDRANT_API_KEY = os.getenv('QDRANT_API_KEY')
 
-# Initialize Qdrant client
-client = QdrantClient(url=QDRANT_URL, api_key=QDRANT_API_KEY, grpc_port=6333)
-
-# Initialize the embedder
-embedder = SentenceTransformer('sentence-transformers/all-MiniLM-L6-v2')
-
-# Create collections
-collections = ['united', 'inception']
-for collection in collections:
-    client.create_collection(
-        collection_name=collection,
-        vectors_config={
-            "size": embedder.get_sentence_embedding_dimension(),
-            "distance": "Cosine"
-        }
-    )
+MODEL_NAME = 'sentence-transformers/all-MiniLM-L6-v2'
+
+SOURCES = {
+    'inception': 'cleaned_inception.json',
+    'united': 'cleaned_united.json',
+}
 
-# Function to load data and add to Qdrant
-def load_and_add_to_qdrant(file_path, collection_name):
+# Function to load data and sync it into Qdrant
+def load_and_add_to_qdrant(client, batch_encoder, manifest, file_path, collection_name, args):
     with open(file_path, 'r') as file:
         data = json.load(file)
-    
-    for item in tqdm(data, desc=f"Processing {collection_name}"):
-        text = item['text']
-        vector = embedder.encode(text).tolist()
-        client.upsert(
-            collection_name=collection_name,
-            points=[{
-                'id': item['chunk_id'],
-                'vector': vector,
-                'payload': item
-            }]
-        )
-
-# Load and add data to respective collections
-load_and_add_to_qdrant('cleaned_inception.json', 'inception')
-load_and_add_to_qdrant('cleaned_united.json', 'united')
-
-print("Data has been successfully added to the collections.")
\ No newline at end of file
+
+    points = {item['chunk_id']: (item['text'], item) for item in data}
+    embedded_bytes = 0
+    encode_seconds = 0.0
+
+    def encode(texts):
+        nonlocal embedded_bytes, encode_seconds
+        embedded_bytes += sum(len(text.encode('utf-8')) for text in texts)
+        start = time.perf_counter()
+        try:
+            return batch_encoder(texts)
+        finally:
+            encode_seconds += time.perf_counter() - start
+
+    start = time.perf_counter()
+    embedded, updated, deleted = sync_collection(
+        client, manifest, collection_name, points, MODEL_NAME, encode,
+        batch_size=args.upload_batch_size, parallel=args.upload_workers
+    )
+    elapsed = time.perf_counter() - start
+
+    print(f"{collection_name}: {len(data)} chunks, {embedded} embedded, {updated} payloads updated, "
+          f"{deleted} deleted in {elapsed:.1f}s")
+    if embedded:
+        # Everything but encoding is Qdrant traffic: the upload, payload updates and deletes
+        upload_seconds = elapsed - encode_seconds
+        print(f"  encode {encode_seconds:.1f}s: {embedded / encode_seconds:.1f} chunks/s, "
+              f"{embedded_bytes / 1e6 / encode_seconds:.2f} MB/s")
+        print(f"  upload {upload_seconds:.1f}s: {embedded / upload_seconds:.1f} chunks/s")
+
+def main():
+    parser = argparse.ArgumentParser(description="Embed the inception and united chunks and upload them to Qdrant.")
+    parser.add_argument('--batch-size', type=int, default=64, help="Chunks per encoder batch")
+    parser.add_argument('--workers', type=int, default=os.cpu_count(),
+                        help="Encoder processes; 1 encodes in this process")
+    parser.add_argument('--upload-batch-size', type=int, default=256, help="Points per upsert request")
+    parser.add_argument('--upload-workers', type=int, default=4, help="Parallel upload processes")
+    parser.add_argument('--manifest', default='index_manifest',
+                        help="Directory with the local record of indexed points, one file per collection")
+    parser.add_argument('--full', action='store_true', help="Ignore the manifest: re-index everything and delete points no longer in the source")
+    parser.add_argument('--recreate', action='store_true', help="Drop and rebuild the collections")
+    add_storage_arguments(parser)
+    args = parser.parse_args()
+
+    # Initialize Qdrant client
+    client = QdrantClient(url=QDRANT_URL, api_key=QDRANT_API_KEY, grpc_port=6333)
+
+    # Initialize the embedder
+    embedder = SentenceTransformer(MODEL_NAME)
+    manifest = IndexManifest(args.manifest)
+
+    # Create collections that don't exist yet; a new collection also means the
+    # manifest no longer describes what is indexed
+    for collection in SOURCES:
+        ensure_collection(client, collection, embedder.get_sentence_embedding_dimension(), manifest, args.recreate,
+                          args.quantization, args.on_disk)
+        if args.full:
+            # Start from what Qdrant actually holds so stale points get deleted too
+            manifest.reset_from_collection(client, collection)
+
+    # Encoder processes are shared by both collections
+    batch_encoder = BatchEncoder(embedder, args.batch_size, args.workers)
+    try:
+        start = time.perf_counter()
+        for collection, file_path in SOURCES.items():
+            load_and_add_to_qdrant(client, batch_encoder, manifest, file_path, collection, args)
+        print(f"Data has been successfully added to the collections in {time.perf_counter() - start:.1f}s.")
+    finally:
+        batch_encoder.close()
+
+if __name__ == "__main__":
+    main()
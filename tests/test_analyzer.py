@@ -0,0 +1,34 @@
+from analyzer import CLUBS, analyze_query, club_context
+
+
+def test_course_codes_are_normalized():
+    assert analyze_query("compare COL106, COL 202 and MTL-100").course_codes == ['COL106', 'COL202', 'MTL100']
+
+def test_numbers_after_words_are_not_course_codes():
+    assert analyze_query("top 100 courses").course_codes == []
+    assert analyze_query("how to study for 100 marks").course_codes == []
+    assert analyze_query("exchange in 2023").course_codes == []
+    assert analyze_query("is ELL1010 a thing").course_codes == []
+
+def test_lowercase_codes_need_a_known_department():
+    assert analyze_query("is col106 hard").course_codes == []
+    assert analyze_query("is col106 hard", {'COL'}).course_codes == ['COL106']
+    assert analyze_query("top 100 courses", {'COL'}).course_codes == []
+
+def test_keywords_match_whole_words():
+    assert analyze_query("I have a doubt about international exchange").collections == set()
+    assert analyze_query("bt in the hostel mess").collections == {'inception'}
+    assert analyze_query("study material for interviews").collections == {'courses', 'interviews'}
+
+def test_keywords_ignore_case():
+    assert analyze_query("Best HOSTEL canteen").collections == {'inception'}
+
+def test_clubs_by_name_and_alias_keep_their_order():
+    assert analyze_query("should I join the robotics club or dev club").clubs == ['DevClub', 'Robotics Club']
+
+def test_generic_club_mention_brings_in_every_club():
+    assert analyze_query("which clubs should I join").clubs == list(CLUBS)
+
+def test_club_context():
+    assert club_context(['QC']) == CLUBS['QC']
+    assert club_context([]) == "No specific club information found in the query."
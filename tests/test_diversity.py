@@ -0,0 +1,64 @@
+import numpy as np
+
+from diversity import find_overlap, merge_adjacent, mmr
+
+
+def chunk(point_id, chunk_id, text, score, vector=None):
+    return {'id': point_id, 'score': score, 'payload': {'text': text, 'chunk_id': chunk_id}, 'vector': vector}
+
+
+def test_find_overlap():
+    assert find_overlap("the mess food is " + "x" * 50 + " pretty good", "x" * 50 + " pretty good at night") == 62
+    assert find_overlap("no shared text here", "something else entirely") == 0
+    assert find_overlap("anything", "") == 0
+
+def test_merge_adjacent_joins_overlapping_chunks():
+    shared = "the canteen near the library stays open late"
+    hits = [
+        chunk('b', 2, shared + " and serves maggi", 0.02),
+        chunk('a', 1, "after the exam we went out, " + shared, 0.03),
+    ]
+    merged = merge_adjacent('inception', hits)
+    assert len(merged) == 1
+    assert merged[0]['payload']['text'] == "after the exam we went out, " + shared + " and serves maggi"
+    assert merged[0]['payload']['merged_ids'] == ['a', 'b']
+    assert merged[0]['score'] == 0.03
+
+def test_merge_adjacent_keeps_magazine_chunks_without_overlap_apart():
+    # Neighbouring chunk numbers across magazine issues are different articles
+    hits = [chunk('a', 1, "hostel night", 0.03), chunk('b', 2, "placement season", 0.02)]
+    assert [hit['id'] for hit in merge_adjacent('inception', hits)] == ['a', 'b']
+
+def test_merge_adjacent_joins_interview_chunks_of_one_document():
+    hits = [
+        {'id': 'b', 'score': 0.02, 'payload': {'data': "second part", 'original_doc_id': 7, 'chunk_index': 1}},
+        {'id': 'a', 'score': 0.01, 'payload': {'data': "first part", 'original_doc_id': 7, 'chunk_index': 0}},
+        {'id': 'c', 'score': 0.03, 'payload': {'data': "other senior", 'original_doc_id': 8, 'chunk_index': 1}},
+    ]
+    merged = merge_adjacent('interviews', hits)
+    assert [hit['id'] for hit in merged] == ['c', 'a']
+    assert merged[1]['payload']['data'] == "first part second part"
+    assert merged[1]['score'] == 0.02
+
+def test_mmr_keeps_ranking_for_alike_on_topic_hits():
+    # Ranks 1-6 on topic and alike, 7-12 unrelated, scored like fused ranks
+    rng = np.random.default_rng(0)
+    topic = rng.normal(size=384)
+    hits = [
+        {'id': rank, 'score': 1 / (61 + rank),
+         'vector': topic + rng.normal(size=384) * 0.3 if rank < 6 else rng.normal(size=384)}
+        for rank in range(12)
+    ]
+    assert [hit['id'] for hit in mmr(hits, 3)] == [0, 1, 2]
+
+def test_mmr_skips_a_near_duplicate():
+    rng = np.random.default_rng(0)
+    vectors = [rng.normal(size=384) for _ in range(6)]
+    vectors[1] = vectors[0] + rng.normal(size=384) * 0.05
+    hits = [{'id': rank, 'score': 1 / (61 + rank), 'vector': vector} for rank, vector in enumerate(vectors)]
+    assert [hit['id'] for hit in mmr(hits, 2)] == [0, 2]
+
+def test_mmr_without_vectors_keeps_the_top_hits():
+    hits = [{'id': rank, 'score': 1 / (61 + rank), 'vector': None} for rank in range(5)]
+    assert mmr(hits, 2) == hits[:2]
+    assert mmr(hits[:2], 3) == hits[:2]
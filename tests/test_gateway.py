@@ -0,0 +1,191 @@
+import asyncio
+from types import SimpleNamespace
+
+import groq as groq_errors
+import httpx
+import pytest
+
+from gateway import LLMGateway, TokenBucket
+
+MESSAGES = [{"role": "user", "content": "which hostel has the best mess"}]
+
+
+def rate_limit_error():
+    request = httpx.Request("POST", "https://api.groq.com/openai/v1/chat/completions")
+    response = httpx.Response(429, headers={"retry-after": "0"}, request=request)
+    return groq_errors.RateLimitError("rate limited", response=response, body=None)
+
+def connection_error():
+    return groq_errors.APIConnectionError(request=httpx.Request("POST", "https://api.groq.com/openai/v1/chat/completions"))
+
+def completion(text, prompt_tokens=10, completion_tokens=5):
+    return SimpleNamespace(
+        choices=[SimpleNamespace(message=SimpleNamespace(content=text))],
+        usage=SimpleNamespace(prompt_tokens=prompt_tokens, completion_tokens=completion_tokens),
+    )
+
+
+class StubCompletions:
+    """Groq's chat.completions with scripted failures per model."""
+
+    def __init__(self, failures=None, error=rate_limit_error, hang=False):
+        self.failures = dict(failures or {})
+        self.error = error
+        self.hang = hang
+        self.calls = []
+        self.closed = 0
+
+    async def create(self, model, messages, stream=False, **kwargs):
+        self.calls.append(model)
+        await asyncio.sleep(0)
+        if self.failures.get(model):
+            self.failures[model] -= 1
+            raise self.error()
+        if not stream:
+            return completion(f"answer from {model}")
+
+        async def chunks():
+            try:
+                yield SimpleNamespace(choices=[SimpleNamespace(delta=SimpleNamespace(content="an"))], x_groq=None)
+                if self.hang:
+                    await asyncio.Event().wait()
+                usage = SimpleNamespace(prompt_tokens=20, completion_tokens=2)
+                yield SimpleNamespace(choices=[SimpleNamespace(delta=SimpleNamespace(content="swer"))],
+                                      x_groq=SimpleNamespace(usage=usage))
+            finally:
+                self.closed += 1
+        return chunks()
+
+def gateway(failures=None, error=rate_limit_error, hang=False, **kwargs):
+    completions = StubCompletions(failures, error, hang)
+    client = SimpleNamespace(chat=SimpleNamespace(completions=completions))
+    models = [("primary", 30, 5000), ("fallback", 30, 1000)]
+    return LLMGateway(client, models, base_delay=0.0, max_queue_wait=0.0, **kwargs), completions
+
+
+def test_bucket_release_refunds_up_to_capacity():
+    async def run():
+        bucket = TokenBucket(rate=1, capacity=100)
+        assert await bucket.acquire(80)
+        bucket.release(30)
+        assert 49 <= bucket.available <= 51
+        bucket.release(500)
+        assert bucket.available == 100
+    asyncio.run(run())
+
+def test_bucket_gives_up_past_the_timeout():
+    async def run():
+        bucket = TokenBucket(rate=1, capacity=10)
+        assert await bucket.acquire(10)
+        assert not await bucket.acquire(5, timeout=0.01)
+    asyncio.run(run())
+
+def test_completion_settles_the_reservation():
+    async def run():
+        llm, _ = gateway()
+        await llm.complete(MESSAGES, max_tokens=1000)
+        # The prompt estimate plus 1000 tokens were reserved; 15 were used
+        assert 4980 <= llm.quotas["primary"].tokens.available <= 5000
+    asyncio.run(run())
+
+def test_stream_settles_against_the_reported_usage():
+    async def run():
+        llm, _ = gateway()
+        chunks = [chunk async for chunk in llm.stream(MESSAGES, max_tokens=1000)]
+        assert chunks == ["an", "swer"]
+        assert 4975 <= llm.quotas["primary"].tokens.available <= 4985
+    asyncio.run(run())
+
+def test_abandoned_stream_stops_generating():
+    async def run():
+        llm, completions = gateway(hang=True)
+        stream = llm.stream(MESSAGES, max_tokens=1000)
+        assert await stream.__anext__() == "an"
+        await stream.aclose()
+        for _ in range(5):
+            await asyncio.sleep(0)
+        assert completions.closed == 1
+        assert llm.in_flight == {}
+        # Settled against what was generated before the caller left
+        assert llm.quotas["primary"].tokens.available > 4980
+    asyncio.run(run())
+
+def test_stream_keeps_going_while_a_caller_reads():
+    async def run():
+        llm, completions = gateway()
+        leaving, staying = llm.stream(MESSAGES), llm.stream(MESSAGES)
+        assert await leaving.__anext__() == "an"
+        assert await staying.__anext__() == "an"
+        await leaving.aclose()
+        assert [chunk async for chunk in staying] == ["swer"]
+        assert completions.calls == ["primary"]
+    asyncio.run(run())
+
+def test_failed_requests_refund_tokens_and_charge_retries():
+    async def run():
+        llm, completions = gateway(failures={"primary": 4}, error=connection_error)
+        response = await llm.complete(MESSAGES, max_tokens=1000)
+        assert response.choices[0].message.content == "answer from fallback"
+        assert completions.calls == ["primary"] * 4 + ["fallback"]
+        assert llm.quotas["primary"].tokens.available > 4990
+        assert llm.quotas["primary"].requests.available < 27
+    asyncio.run(run())
+
+def test_rejected_request_refunds_tokens():
+    def bad_request():
+        request = httpx.Request("POST", "https://api.groq.com/openai/v1/chat/completions")
+        return groq_errors.BadRequestError("bad request", response=httpx.Response(400, request=request), body=None)
+
+    async def run():
+        llm, _ = gateway(failures={"primary": 1}, error=bad_request)
+        with pytest.raises(groq_errors.BadRequestError):
+            await llm.complete(MESSAGES, max_tokens=1000)
+        assert llm.quotas["primary"].tokens.available > 4990
+    asyncio.run(run())
+
+def test_throttled_primary_falls_back():
+    async def run():
+        llm, completions = gateway(failures={"primary": 1})
+        response = await llm.complete(MESSAGES, max_tokens=100)
+        assert response.choices[0].message.content == "answer from fallback"
+        assert completions.calls == ["primary", "fallback"]
+        # A 429 drains the primary's budget so queued requests back off too
+        assert llm.quotas["primary"].tokens.available < 100
+    asyncio.run(run())
+
+def test_primary_without_budget_falls_back_without_a_call():
+    async def run():
+        llm, completions = gateway()
+        llm.quotas["primary"].drain()
+        response = await llm.complete(MESSAGES, max_tokens=100)
+        assert response.choices[0].message.content == "answer from fallback"
+        assert completions.calls == ["fallback"]
+    asyncio.run(run())
+
+def test_last_model_retries_throttling():
+    async def run():
+        llm, completions = gateway(failures={"fallback": 2})
+        response = await llm.complete(MESSAGES, models=["fallback"], max_tokens=10)
+        assert response.choices[0].message.content == "answer from fallback"
+        assert completions.calls == ["fallback"] * 3
+    asyncio.run(run())
+
+def test_background_calls_leave_headroom():
+    async def run():
+        llm, completions = gateway(background_headroom=0.5)
+        llm.quotas["fallback"].tokens.available = 600
+        with pytest.raises(RuntimeError):
+            await llm.complete(MESSAGES, models=["fallback"], background=True, max_tokens=200)
+        assert completions.calls == []
+        # Answers may still use the whole budget
+        await llm.complete(MESSAGES, models=["fallback"], max_tokens=200)
+        assert completions.calls == ["fallback"]
+    asyncio.run(run())
+
+def test_identical_requests_share_one_call():
+    async def run():
+        llm, completions = gateway()
+        first, second = await asyncio.gather(llm.complete(MESSAGES), llm.complete(MESSAGES))
+        assert first is second
+        assert completions.calls == ["primary"]
+    asyncio.run(run())
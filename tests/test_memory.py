@@ -0,0 +1,52 @@
+from context import estimate_tokens
+from memory import Conversation, summary_prompt
+
+
+def conversation_with(exchanges):
+    conversation = Conversation()
+    for query, answer in exchanges:
+        conversation.add_exchange(query, answer)
+    return conversation
+
+
+def test_empty_conversation_has_no_block():
+    conversation = Conversation()
+    assert conversation.history_block(700) == ""
+    assert not conversation.started()
+
+def test_summary_then_unsummarized_messages():
+    conversation = conversation_with([("is COL106 hard", "yes"), ("who teaches it", "prof X")])
+    conversation.update_summary("Asked about COL106's difficulty.", 2)
+    assert conversation.history_block(700) == (
+        "\nConversation so far: Asked about COL106's difficulty."
+        "\nRecent conversation:\nuser: who teaches it\nassistant: prof X"
+    )
+
+def test_newest_messages_win_the_budget():
+    conversation = conversation_with([("old question " * 100, "old answer " * 100), ("new question", "new answer")])
+    block = conversation.history_block(50)
+    assert "new question" in block and "new answer" in block
+    assert "old question" not in block
+    # The budget covers message contents; headers and role labels come on top
+    assert estimate_tokens(block) <= 50 + 20
+
+def test_pending_summary_leaves_out_the_latest_exchange():
+    conversation = conversation_with([("q1", "a1")])
+    assert conversation.pending_summary() is None
+    conversation.add_exchange("q2", "a2")
+    summary, messages, target = conversation.pending_summary()
+    assert (summary, target) == ("", 2)
+    assert [message['content'] for message in messages] == ["q1", "a1"]
+    conversation.update_summary("s", target)
+    assert conversation.pending_summary() is None
+
+def test_transcript_is_a_copy():
+    conversation = conversation_with([("q1", "a1")])
+    transcript = conversation.transcript()
+    conversation.add_exchange("q2", "a2")
+    assert len(transcript) == 2
+
+def test_summary_prompt_includes_the_old_summary_and_new_messages():
+    prompt = summary_prompt("Likes COL courses.", [{"role": "user", "content": "any good MTL electives"}])
+    assert "Likes COL courses." in prompt
+    assert "user: any good MTL electives" in prompt
@@ -0,0 +1,35 @@
+from planner import course_payload_fields, plan_course_query
+
+DEPARTMENTS = {'COL', 'MTL', 'ELL'}
+
+
+def test_no_constraints_no_plan():
+    assert plan_course_query("how is the hostel mess", DEPARTMENTS) is None
+
+def test_constraints_become_filter_conditions():
+    plan = plan_course_query("which 3-credit COL courses are in slot A", DEPARTMENTS)
+    assert (plan.department, plan.credits, plan.slot) == ('COL', 3.0, 'a')
+    assert {condition.key for condition in plan.to_filter().must} == {'department', 'credits_value', 'slot'}
+    assert plan.describe() == "department COL, 3 credits, slot A"
+
+def test_level_and_instructor():
+    plan = plan_course_query("400 level courses taught by Prof Sharma", DEPARTMENTS)
+    assert plan.level == 4
+    assert plan.instructor == "sharma"
+
+def test_slot_needs_a_capitalised_letter():
+    assert plan_course_query("what slot is it in", DEPARTMENTS) is None
+
+def test_unknown_departments_are_ignored():
+    assert plan_course_query("is the CSE fest fun", DEPARTMENTS) is None
+
+def test_listing_needs_explicit_list_phrasing():
+    assert plan_course_query("which 3-credit COL courses are in slot A", DEPARTMENTS).listing
+    assert plan_course_query("list the 400 level courses", DEPARTMENTS).listing
+    assert plan_course_query("show me all slot B courses", DEPARTMENTS).listing
+    assert not plan_course_query("which prof teaches the 3 credit COL course", DEPARTMENTS).listing
+    assert not plan_course_query("is 4 credits a lot for a COL course", DEPARTMENTS).listing
+
+def test_course_payload_fields():
+    assert course_payload_fields("COL106", "4") == {'department': 'COL', 'level': 1, 'credits_value': 4.0}
+    assert course_payload_fields("COL106", "") == {'department': 'COL', 'level': 1, 'credits_value': None}